@@ -1,3 +1,4 @@
+import argparse
 import asyncio
 import json
 import random
@@ -5,11 +6,10 @@ from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 
-from google import genai
-from google.genai import types
-from playwright.async_api import Browser, Page, async_playwright
+from playwright.async_api import Browser, BrowserContext, Page, async_playwright
 
-from config.settings import BASE_DIR, get_settings
+from config.settings import BASE_DIR
+from services.llm import LLMProvider, create_llm_provider
 
 
 @dataclass
@@ -30,23 +30,30 @@ class ConversationAgent:
     def __init__(
         self,
         config: AgentConfig,
-        gemini_api_key: str,
+        llm: LLMProvider,
         base_url: str = "http://localhost:8000",
         headless: bool = True,
     ):
         self.config = config
-        self.gemini_api_key = gemini_api_key
+        self.llm = llm
         self.base_url = base_url
         self.page: Page | None = None
         self.browser: Browser | None = None
+        self.context: BrowserContext | None = None
         self.conversation_history: list[str] = []
         self.headless = headless
 
-    async def initialize(self, playwright):
-        """Initialiser le navigateur et la page"""
-        self.browser = await playwright.chromium.launch(headless=self.headless)
-        context = await self.browser.new_context()  # type: ignore
-        self.page = await context.new_page()
+    async def initialize(self, playwright, browser: Browser | None = None):
+        """Initialiser le navigateur et la page
+
+        Avec `browser`, l'agent n'ouvre qu'un contexte isolé (cookies, page) dans ce
+        navigateur partagé au lieu de lancer son propre Chromium.
+        """
+        if browser is None:
+            self.browser = await playwright.chromium.launch(headless=self.headless)
+            browser = self.browser
+        self.context = await browser.new_context()
+        self.page = await self.context.new_page()
 
     async def join_chat(self):
         """Rejoindre le chat avec les informations de l'agent"""
@@ -112,10 +119,10 @@ class ConversationAgent:
         except Exception:
             return []
 
-    def generate_response(self, conversation_context: list[dict[str, str]], theme: str) -> str:
-        """Générer une réponse avec Gemini"""
-        client = genai.Client(api_key=self.gemini_api_key)
-
+    def build_prompts(
+        self, conversation_context: list[dict[str, str]], theme: str
+    ) -> tuple[str, str]:
+        """Construire le prompt système et le prompt utilisateur"""
         system_prompt = f"""Tu es {self.config.name}, {self.config.specialist}.
 Tu participes à une discussion et débat sur le thème : "{theme}".
 
@@ -148,18 +155,21 @@ STYLE DE COMMUNICATION selon ton rôle :
 Génère maintenant TON message de réponse courte.
 Réponds UNIQUEMENT avec le message, sans guillemets ni préambule."""
 
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            config=types.GenerateContentConfig(system_instruction=system_prompt),
-            contents=user_prompt,
-        )
+        return system_prompt, user_prompt
 
-        message = response.text.strip()  # type: ignore
+    @staticmethod
+    def clean_message(text: str | None) -> str:
+        """Nettoyer le message généré"""
+        message = (text or "").strip()
+        return message.replace('"', "").replace("'", "'")
 
-        # Nettoyer le message
-        message = message.replace('"', "").replace("'", "'")
-
-        return message
+    async def generate_response(
+        self, conversation_context: list[dict[str, str]], theme: str
+    ) -> str:
+        """Générer une réponse avec le fournisseur LLM, sans bloquer la boucle d'événements"""
+        system_prompt, user_prompt = self.build_prompts(conversation_context, theme)
+        response = await self.llm.generate(user_prompt, system=system_prompt)
+        return self.clean_message(response)
 
     async def send_message(self, message: str):
         """Envoyer un message dans le chat"""
@@ -182,7 +192,9 @@ Réponds UNIQUEMENT avec le message, sans guillemets ni préambule."""
         # print(f"💬 {self.config.name}: {message}")
 
     async def close(self):
-        """Fermer le navigateur"""
+        """Fermer le contexte, et le navigateur s'il appartient à l'agent"""
+        if self.context:
+            await self.context.close()
         if self.browser:
             await self.browser.close()
 
@@ -193,17 +205,26 @@ class ConversationOrchestrator:
     def __init__(
         self,
         agents_file: Path | str,
-        gemini_api_key: str,
+        llm: LLMProvider | None = None,
         base_url: str = "http://localhost:8000",
         num_rounds: int = 10,
+        concurrent: bool = False,
+        concurrency: int = 4,
+        headless: bool = True,
     ):
         self.agents_file = agents_file
-        self.gemini_api_key = gemini_api_key
+        # Fournisseur LLM partagé par tous les agents (gemini ou stub, cf. LLM_PROVIDER)
+        self.llm = llm or create_llm_provider()
         self.base_url = base_url
         self.agents: list[ConversationAgent] = []
         self.theme: str = ""
         self.conversation_history: list[dict] = []
         self.num_rounds = num_rounds
+        # Mode concurrent : navigateur partagé, connexions en parallèle et tours simultanés
+        self.concurrent = concurrent
+        self.concurrency = concurrency
+        self.headless = headless
+        self.browser: Browser | None = None
 
     def load_agents_config(self) -> tuple[str, list[AgentConfig]]:
         """Charger la configuration des agents depuis le fichier JSON"""
@@ -236,13 +257,17 @@ class ConversationOrchestrator:
 
     async def initialize_agents(self):
         """Initialiser tous les agents"""
+        if self.concurrent:
+            await self.initialize_agents_concurrently()
+            return
+
         self.theme, agents_config = self.load_agents_config()
 
         async with async_playwright() as playwright:
             print(f"🎭 Initialisation de {len(agents_config)} agents...")
 
             for config in agents_config:
-                agent = ConversationAgent(config, self.gemini_api_key, self.base_url)
+                agent = ConversationAgent(config, self.llm, self.base_url, self.headless)
                 await agent.initialize(playwright)
                 await agent.join_chat()
                 self.agents.append(agent)
@@ -257,6 +282,29 @@ class ConversationOrchestrator:
             # Lancer la conversation
             await self.run_conversation()
 
+    async def initialize_agents_concurrently(self):
+        """Initialiser tous les agents en parallèle, dans un seul navigateur partagé"""
+        self.theme, agents_config = self.load_agents_config()
+
+        async with async_playwright() as playwright:
+            print(f"🎭 Initialisation de {len(agents_config)} agents (navigateur partagé)...")
+            self.browser = await playwright.chromium.launch(headless=self.headless)
+
+            self.agents = [
+                ConversationAgent(config, self.llm, self.base_url, self.headless)
+                for config in agents_config
+            ]
+
+            async def join(agent: ConversationAgent):
+                await agent.initialize(playwright, browser=self.browser)
+                await agent.join_chat()
+
+            await asyncio.gather(*(join(agent) for agent in self.agents))
+
+            print("\n✅ Tous les agents sont connectés et prêts à débattre !\n")
+
+            await self.run_conversation_concurrently()
+
     async def run_conversation(self):
         """Lancer la conversation entre les agents"""
         print(f"\n🎬 Démarrage de la conversation sur : {self.theme}\n")
@@ -277,7 +325,7 @@ class ConversationOrchestrator:
                     #     context = f"Début de la discussion sur : {self.theme}"
 
                     # Générer et envoyer la réponse
-                    response = agent.generate_response(last_messages, self.theme)
+                    response = await agent.generate_response(last_messages, self.theme)
                     await agent.send_message(response)
 
                     # Enregistrer dans l'historique
@@ -294,11 +342,53 @@ class ConversationOrchestrator:
         finally:
             await self.cleanup()
 
+    async def run_conversation_concurrently(self):
+        """Lancer la conversation avec des tours simultanés
+
+        Chaque agent enchaîne ses tours sur sa propre page ; au plus `concurrency`
+        tours (lecture du contexte, génération, envoi) sont en cours en même temps,
+        ce qui produit des conversations qui se chevauchent.
+        """
+        print(
+            f"\n🎬 Démarrage de la conversation sur : {self.theme} "
+            f"({self.concurrency} tours simultanés)\n"
+        )
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def take_turns(agent: ConversationAgent):
+            for round_num in range(self.num_rounds):
+                await asyncio.sleep(random.uniform(3, 6))
+                async with semaphore:
+                    try:
+                        last_messages = await agent.get_last_messages(count=5)
+                        response = await agent.generate_response(last_messages, self.theme)
+                        await agent.send_message(response)
+                    except Exception as e:
+                        print(f"⚠️ Tour {round_num + 1} de {agent.config.name} échoué: {e}")
+                        continue
+
+                self.conversation_history.append(
+                    {
+                        "timestamp": datetime.now().isoformat(),
+                        "agent": agent.config.name,
+                        "message": response,
+                    }
+                )
+                print(f"   💬 {agent.config.name} (tour {round_num + 1}/{self.num_rounds})")
+
+        try:
+            await asyncio.gather(*(take_turns(agent) for agent in self.agents))
+        finally:
+            await self.cleanup()
+
     async def cleanup(self):
         """Nettoyer et fermer tous les agents"""
         print("\n🧹 Nettoyage...")
-        for agent in self.agents:
-            await agent.close()
+        await asyncio.gather(*(agent.close() for agent in self.agents), return_exceptions=True)
+        if self.browser:
+            await self.browser.close()
+            self.browser = None
+        await self.llm.aclose()
         print("✅ Nettoyage terminé")
 
         # Sauvegarder l'historique
@@ -317,22 +407,44 @@ class ConversationOrchestrator:
         print(f"📝 Historique sauvegardé dans {filename}")
 
 
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Simulation de conversation entre agents")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--rounds", type=int, default=5, help="Nombre de tours de conversation")
+    parser.add_argument(
+        "--concurrent",
+        action="store_true",
+        help="Navigateur partagé, connexions en parallèle et tours simultanés",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=4, help="Tours simultanés en mode concurrent"
+    )
+    parser.add_argument(
+        "--headed",
+        dest="headless",
+        action="store_false",
+        help="Afficher les navigateurs (headless par défaut)",
+    )
+    return parser.parse_args()
+
+
 async def main():
     """Point d'entrée principal"""
+    args = parse_args()
+
     # Configuration
     AGENTS_FILE = BASE_DIR / "agents.json"
-    GEMINI_API_KEY = get_settings().gemini_api_key  # À remplacer
-    BASE_URL = "http://localhost:8000"
-    NUM_ROUNDS = 5  # Nombre de tours de conversation
-
-    # print(AGENTS_FILE, GEMINI_API_KEY)
+    BASE_URL = args.base_url
+    NUM_ROUNDS = args.rounds  # Nombre de tours de conversation
 
     # Créer l'orchestrateur
     orchestrator = ConversationOrchestrator(
         agents_file=AGENTS_FILE,
-        gemini_api_key=GEMINI_API_KEY,
         base_url=BASE_URL,
         num_rounds=NUM_ROUNDS,
+        concurrent=args.concurrent,
+        concurrency=args.concurrency,
+        headless=args.headless,
     )
 
     # Lancer la conversation
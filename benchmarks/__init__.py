@@ -0,0 +1,10 @@
+"""Benchmarks de ChatX : insertion, historique, sérialisation et diffusion SSE/WebSocket
+
+Les résultats sont écrits en JSON (métadonnées : commit, Python, base) pour être
+comparés d'un commit à l'autre.
+
+Exemples :
+    pdm run bench run --output base.json
+    pdm run bench run --database-url postgresql+psycopg://admin@localhost:5432/chat_bench
+    pdm run bench compare base.json head.json
+"""
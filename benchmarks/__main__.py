@@ -0,0 +1,119 @@
+import argparse
+import asyncio
+import contextlib
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.common import compare_reports, environment, print_results, write_report
+
+SUITES = ("insert", "history", "serialization", "fanout")
+
+
+def parse_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmarks de ChatX")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Exécuter les benchmarks")
+    run.add_argument(
+        "--database-url",
+        default=os.environ.get("BENCH_DATABASE_URL"),
+        help="Base dédiée aux benchmarks (par défaut : SQLite temporaire)",
+    )
+    run.add_argument(
+        "--suite",
+        type=lambda value: value.split(","),
+        default=list(SUITES),
+        help=f"Suites à exécuter, séparées par des virgules ({', '.join(SUITES)})",
+    )
+    run.add_argument("--inserts", type=int, default=1000, help="Messages insérés par mesure")
+    run.add_argument(
+        "--sizes", type=parse_list, default=[1000, 10_000, 100_000], help="Tailles de table"
+    )
+    run.add_argument("--queries", type=int, default=200, help="Requêtes par mesure d'historique")
+    run.add_argument(
+        "--subscribers", type=parse_list, default=[10, 100, 1000], help="Nombres d'abonnés"
+    )
+    run.add_argument("--messages", type=int, default=200, help="Messages diffusés par mesure")
+    run.add_argument("--reset", action="store_true", help="Vider une base non vide")
+    run.add_argument("--output", help="Écrire les résultats JSON dans ce fichier")
+
+    compare = commands.add_parser("compare", help="Comparer deux rapports JSON")
+    compare.add_argument("base")
+    compare.add_argument("head")
+    compare.add_argument(
+        "--threshold", type=float, default=0.05, help="Variation relative ignorée (bruit)"
+    )
+    return parser.parse_args()
+
+
+async def run_suites(args: argparse.Namespace) -> None:
+    # Importés après la configuration de l'environnement : les réglages sont lus à l'import
+    from benchmarks.database import (
+        bench_history,
+        bench_insert,
+        drop_database,
+        prepare_database,
+    )
+    from benchmarks.fanout import bench_fanout
+    from benchmarks.serialization import bench_serialization
+    from config.database import async_engine
+
+    uses_database = bool({"insert", "history"} & set(args.suite))
+    if uses_database:
+        prepare_database(args.reset)
+
+    suites = {
+        "insert": lambda: bench_insert(args.inserts),
+        "history": lambda: bench_history(args.sizes, args.queries),
+        "serialization": lambda: asyncio.to_thread(bench_serialization),
+        "fanout": lambda: bench_fanout(args.subscribers, args.messages),
+    }
+    meta = environment(async_engine.dialect.name)
+    print(f"⏱️ Benchmarks sur {meta['database']} (commit {meta['commit']})")
+
+    results = []
+    for name in args.suite:
+        print(f"▶️ {name}...")
+        # Les traces de l'application (une par message) faussent les mesures dans un terminal
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            suite_results = await suites[name]()
+        print_results(suite_results)
+        results.extend(suite_results)
+
+    await async_engine.dispose()
+    if uses_database:
+        drop_database()
+    if args.output:
+        write_report(args.output, meta, results)
+        print(f"📝 Résultats sauvegardés dans {args.output}")
+
+
+def main():
+    args = parse_args()
+    if args.command == "compare":
+        sys.exit(1 if compare_reports(args.base, args.head, args.threshold) else 0)
+
+    unknown = set(args.suite) - set(SUITES)
+    if unknown:
+        sys.exit(f"❌ Suites inconnues : {', '.join(sorted(unknown))}")
+
+    database_url = args.database_url
+    if database_url is None:
+        path = Path(tempfile.gettempdir()) / "chatx-bench.db"
+        path.unlink(missing_ok=True)
+        database_url = f"sqlite:///{path}"
+    os.environ["DATABASE_URL"] = database_url
+    # Diffusion mesurée dans un seul processus, sans dépendre du broker configuré
+    os.environ["BROKER"] = "memory"
+
+    asyncio.run(run_suites(args))
+
+
+if __name__ == "__main__":
+    main()
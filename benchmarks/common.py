@@ -0,0 +1,157 @@
+"""Outils communs : mesures, statistiques et rapports JSON comparables entre commits"""
+
+import json
+import platform
+import subprocess
+import sys
+import timeit
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime
+
+FORMAT_VERSION = 1
+# Extrêmes trop sensibles au bruit pour signaler une régression
+NOISY_METRICS = {"p99_ms", "max_ms"}
+
+
+@dataclass
+class Result:
+    """Résultat d'un benchmark : nom, paramètres et métriques (nombres)"""
+
+    name: str
+    params: dict
+    metrics: dict[str, float]
+
+    @property
+    def key(self) -> str:
+        """Identifiant stable d'un résultat, utilisé pour comparer deux rapports"""
+        params = ",".join(f"{name}={value}" for name, value in sorted(self.params.items()))
+        return f"{self.name}[{params}]" if params else self.name
+
+
+def higher_is_better(metric: str) -> bool:
+    """Les débits (`*_per_sec`) doivent augmenter, les durées diminuer"""
+    return metric.endswith("_per_sec")
+
+
+def latency_metrics(samples: list[float]) -> dict[str, float]:
+    """Moyenne et percentiles (ms) d'une série de durées en secondes"""
+    ordered = sorted(samples)
+
+    def percentile(quantile: float) -> float:
+        return ordered[min(len(ordered) - 1, int(quantile * len(ordered)))] * 1000
+
+    return {
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def per_op_metrics(func: Callable[[], object], repeat: int = 5) -> dict[str, float]:
+    """Coût unitaire d'une opération rapide : médiane de `repeat` séries calibrées (timeit)"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    runs = sorted(total / number for total in timer.repeat(repeat=repeat, number=number))
+    median = runs[len(runs) // 2]
+    return {"us_per_op": median * 1_000_000, "ops_per_sec": 1 / median}
+
+
+def git_revision() -> dict:
+    """Commit courant et état du répertoire de travail (si git est disponible)"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": commit, "dirty": bool(status.strip())}
+
+
+def environment(dialect: str) -> dict:
+    return {
+        **git_revision(),
+        "timestamp": datetime.now(UTC).isoformat(),
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "database": dialect,
+    }
+
+
+def write_report(path: str, meta: dict, results: list[Result]) -> None:
+    report = {
+        "format": FORMAT_VERSION,
+        "meta": meta,
+        "results": [
+            {**asdict(result), "metrics": {k: round(v, 4) for k, v in result.metrics.items()}}
+            for result in results
+        ],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+def load_report(path: str) -> tuple[dict, dict[str, Result]]:
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    results = (Result(**result) for result in report["results"])
+    return report["meta"], {result.key: result for result in results}
+
+
+def print_results(results: list[Result]) -> None:
+    for result in results:
+        metrics = "  ".join(f"{name}={value:,.3f}" for name, value in result.metrics.items())
+        print(f"  {result.key:<48} {metrics}")
+
+
+def compare_reports(base_path: str, head_path: str, threshold: float = 0.05) -> int:
+    """Compare deux rapports métrique par métrique ; retourne le nombre de régressions
+
+    Une variation inférieure au seuil relatif (`threshold`) est considérée comme du bruit.
+    """
+    base_meta, base = load_report(base_path)
+    head_meta, head = load_report(head_path)
+    database = head_meta.get("database")
+    print(f"📊 {base_meta.get('commit')} → {head_meta.get('commit')} ({database})")
+    if base_meta.get("database") != database:
+        print(f"⚠️ Bases différentes : {base_meta.get('database')} / {database}")
+
+    regressions = 0
+    for key, result in head.items():
+        previous = base.get(key)
+        if previous is None:
+            print(f"  🆕 {key}")
+            continue
+        for metric, value in result.metrics.items():
+            before = previous.metrics.get(metric)
+            if not before or metric in NOISY_METRICS:
+                continue
+            change = (value - before) / before
+            improved = change > 0 if higher_is_better(metric) else change < 0
+            if abs(change) < threshold:
+                continue
+            if improved:
+                marker = "✅"
+            else:
+                marker = "❌"
+                regressions += 1
+            print(
+                f"  {marker} {key:<48} {metric:<12} "
+                f"{before:>12,.3f} → {value:>12,.3f} ({change:+.1%})"
+            )
+    for key in sorted(base.keys() - head.keys()):
+        print(f"  🗑️ {key} (absent du nouveau rapport)")
+
+    marker = "❌" if regressions else "✅"
+    print(f"{marker} {regressions} régression(s) au-delà de {threshold:.0%}")
+    return regressions
@@ -0,0 +1,196 @@
+"""Benchmarks base de données : débit d'insertion et latence des requêtes d'historique"""
+
+import asyncio
+import random
+import time
+
+from sqlalchemy import delete, func, inspect, select, text
+
+from benchmarks.common import Result, latency_metrics
+from config.constants import AVATARS, DEFAULT_ROOM
+from config.database import AsyncSessionLocal, Base, async_engine, engine
+from config.settings import get_settings
+from models.message import ArchivedMessage, Message
+from schemas.message import MessageCreate
+from services.broker import InProcessBroker
+from services.message_service import MessageService
+from services.message_writer import MessageWriter
+from services.notification_hub import BROKER_CHANNELS, NotificationHub
+
+settings = get_settings()
+
+# L'archive est lue par l'historique dès qu'un salon n'a plus assez de messages récents
+TABLES = [Message.__table__, ArchivedMessage.__table__]
+
+# La moitié des messages dans le salon par défaut, le reste réparti sur 9 autres salons
+ROOMS = [f"room-{i}" for i in range(1, 10)]
+SEED_CHUNK = 1000
+TEXT = "Bonjour à tous, quelqu'un a des nouvelles du déploiement de ce soir ? "
+
+
+def make_message(i: int, room_id: str = DEFAULT_ROOM, length: int = 80) -> MessageCreate:
+    return MessageCreate(
+        room_id=room_id,
+        username=f"user{i % 100}",
+        avatar=AVATARS[i % len(AVATARS)],
+        message=(f"{i} " + TEXT * (length // len(TEXT) + 1))[:length],
+    )
+
+
+def seed_room(i: int) -> str:
+    return DEFAULT_ROOM if i % 2 == 0 else ROOMS[i % len(ROOMS)]
+
+
+def prepare_database(reset: bool) -> None:
+    """(Re)crée les tables des messages ; refuse une base non vide sans `reset`"""
+    if inspect(engine).has_table(Message.__tablename__) and not reset:
+        with engine.connect() as connection:
+            count = connection.scalar(select(func.count()).select_from(Message))
+        if count:
+            raise SystemExit(
+                f"❌ La base contient déjà {count} messages : utilisez une base dédiée "
+                "aux benchmarks, ou --reset pour la vider"
+            )
+    Base.metadata.drop_all(engine, tables=TABLES)
+    Base.metadata.create_all(engine, tables=TABLES)
+
+
+def drop_database() -> None:
+    Base.metadata.drop_all(engine, tables=TABLES)
+
+
+async def clear_messages() -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(Message))
+        await db.commit()
+
+
+async def seed_messages(total: int) -> None:
+    """Complète la table jusqu'à `total` messages, par lots sans notification"""
+    async with AsyncSessionLocal() as db:
+        current = await db.scalar(select(func.count()).select_from(Message)) or 0
+        for start in range(current, total, SEED_CHUNK):
+            rows = [
+                (make_message(i, seed_room(i)), False)
+                for i in range(start, min(start + SEED_CHUNK, total))
+            ]
+            await MessageService.insert_messages(db, rows, notify=False)
+            await db.commit()
+        # Statistiques à jour pour que le planificateur choisisse les index
+        await db.execute(text(f"ANALYZE {Message.__tablename__}"))
+        await db.commit()
+
+
+async def bench_insert(count: int) -> list[Result]:
+    """Débit d'insertion : un commit par message, par lots, et group commit concurrent"""
+    dialect = async_engine.dialect.name
+    # Sous PostgreSQL, l'insertion peut porter le NOTIFY (broker postgres)
+    notify_modes = (False, True) if dialect == "postgresql" else (False,)
+    results = []
+    await clear_messages()
+
+    for notify in notify_modes:
+        samples = []
+        for i in range(count):
+            started = time.perf_counter()
+            async with AsyncSessionLocal() as db:
+                await MessageService.insert_messages(db, [(make_message(i), False)], notify)
+                await db.commit()
+            samples.append(time.perf_counter() - started)
+        metrics = {"msgs_per_sec": count / sum(samples), **latency_metrics(samples)}
+        results.append(Result("insert.single", {"notify": notify}, metrics))
+
+        for batch_size in (10, 100):
+            samples = []
+            for start in range(0, count, batch_size):
+                rows = [(make_message(i), False) for i in range(start, start + batch_size)]
+                started = time.perf_counter()
+                async with AsyncSessionLocal() as db:
+                    await MessageService.insert_messages(db, rows, notify)
+                    await db.commit()
+                samples.append(time.perf_counter() - started)
+            metrics = {"msgs_per_sec": len(samples) * batch_size / sum(samples)}
+            metrics |= latency_metrics(samples)
+            results.append(
+                Result("insert.batch", {"batch": batch_size, "notify": notify}, metrics)
+            )
+
+    # Chemin de l'application : MessageWriter et publication sur un hub sans abonnés
+    hub = NotificationHub(InProcessBroker(BROKER_CHANNELS))
+    await hub.start()
+    writer = MessageWriter(
+        hub, window=settings.message_write_window, max_batch=settings.message_write_max_batch
+    )
+    for concurrency in (1, 10, 100):
+        samples: list[float] = []
+
+        async def client(offset: int, concurrency=concurrency, samples=samples) -> None:
+            for i in range(offset, count, concurrency):
+                started = time.perf_counter()
+                await writer.create_message(make_message(i))
+                samples.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client(offset) for offset in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        metrics = {"msgs_per_sec": count / elapsed, **latency_metrics(samples)}
+        results.append(Result("insert.writer", {"clients": concurrency}, metrics))
+    await hub.stop()
+    return results
+
+
+async def measure_query(query, iterations: int) -> dict[str, float]:
+    """Latence d'une requête, une session par appel comme dans les routes"""
+    for _ in range(min(10, iterations)):
+        async with AsyncSessionLocal() as db:
+            await query(db)
+
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            await query(db)
+        samples.append(time.perf_counter() - started)
+    return {"ops_per_sec": iterations / sum(samples), **latency_metrics(samples)}
+
+
+async def bench_history(sizes: list[int], iterations: int) -> list[Result]:
+    """Latence des requêtes d'historique pour plusieurs tailles de table"""
+    results = []
+    rng = random.Random(0)
+    await clear_messages()
+
+    for size in sorted(sizes):
+        await seed_messages(size)
+        async with AsyncSessionLocal() as db:
+            first_id, last_id = (
+                await db.execute(
+                    select(func.min(Message.id), func.max(Message.id)).where(
+                        Message.room_id == DEFAULT_ROOM
+                    )
+                )
+            ).one()
+
+        async def latest(db):
+            return await MessageService.get_messages_page(db, DEFAULT_ROOM)
+
+        async def older_page(db, first_id=first_id, last_id=last_id):
+            before_id = rng.randint(first_id, last_id)
+            return await MessageService.get_messages_page(db, DEFAULT_ROOM, before_id=before_id)
+
+        async def missed(db, last_id=last_id):
+            # Rattrapage d'un client reconnecté : ~50 messages du salon
+            return await MessageService.get_messages_after(db, last_id - 100, DEFAULT_ROOM)
+
+        async def by_id(db, first_id=first_id, last_id=last_id):
+            return await MessageService.get_message_by_id(db, rng.randint(first_id, last_id))
+
+        for name, query in (
+            ("history.latest", latest),
+            ("history.page", older_page),
+            ("history.after", missed),
+            ("history.by_id", by_id),
+        ):
+            metrics = await measure_query(query, iterations)
+            results.append(Result(name, {"rows": size}, metrics))
+    return results
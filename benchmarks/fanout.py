@@ -0,0 +1,89 @@
+"""Benchmark de diffusion : débit du hub vers N abonnés SSE ou WebSocket d'un même salon"""
+
+import asyncio
+import contextlib
+import itertools
+import time
+
+from sse_starlette.event import ServerSentEvent, ensure_bytes
+
+from benchmarks.common import Result, latency_metrics
+from benchmarks.serialization import sample_message
+from config.constants import DEFAULT_ROOM
+from routes.sse import message_stream
+from routes.ws import encode_event
+from services.event_stream import room_events
+from services.message_service import MessageService
+from services.notification_hub import CHANNEL_CHAT, notification_hub
+
+_message_ids = itertools.count(1)
+
+
+async def consume_sse(expected: int, published_at: dict[int, float], samples: list[float]):
+    """Client SSE : le générateur de la route, encodé comme par EventSourceResponse"""
+    async with contextlib.aclosing(message_stream(DEFAULT_ROOM)) as stream:
+        received = 0
+        async for item in stream:
+            frame = ensure_bytes(item, ServerSentEvent.DEFAULT_SEPARATOR)
+            # Première ligne de la trame : "id: <ID>"
+            message_id = int(frame.split(b"\r\n", 1)[0].removeprefix(b"id: "))
+            samples.append(time.perf_counter() - published_at[message_id])
+            received += 1
+            if received == expected:
+                return
+
+
+async def consume_ws(expected: int, published_at: dict[int, float], samples: list[float]):
+    """Client WebSocket : événements du salon encodés en trames compactes"""
+    async with contextlib.aclosing(room_events(DEFAULT_ROOM)) as stream:
+        received = 0
+        async for event in stream:
+            encode_event(event)
+            samples.append(time.perf_counter() - published_at[int(event.id)])  # type: ignore
+            received += 1
+            if received == expected:
+                return
+
+
+async def run_fanout(transport: str, subscribers: int, messages: int) -> dict[str, float]:
+    consume = consume_sse if transport == "sse" else consume_ws
+    published_at: dict[int, float] = {}
+    samples: list[float] = []
+    clients = [
+        asyncio.create_task(consume(messages, published_at, samples)) for _ in range(subscribers)
+    ]
+    while notification_hub.room_subscriber_count(DEFAULT_ROOM) < subscribers:
+        await asyncio.sleep(0)
+
+    message = sample_message(80)
+    started = time.perf_counter()
+    for _ in range(messages):
+        message.id = next(_message_ids)
+        payload = MessageService.build_notify_payload(message)
+        published_at[message.id] = time.perf_counter()
+        await notification_hub.publish(CHANNEL_CHAT, payload)
+        # Laisser les abonnés consommer entre deux publications
+        await asyncio.sleep(0)
+    await asyncio.gather(*clients)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "msgs_per_sec": messages / elapsed,
+        "deliveries_per_sec": messages * subscribers / elapsed,
+        **latency_metrics(samples),
+    }
+
+
+async def bench_fanout(subscriber_counts: list[int], messages: int) -> list[Result]:
+    """Diffusion via le hub (broker memory) : publication → trame encodée par abonné"""
+    results = []
+    await notification_hub.start()
+    try:
+        for transport in ("sse", "ws"):
+            for subscribers in subscriber_counts:
+                metrics = await run_fanout(transport, subscribers, messages)
+                params = {"transport": transport, "subscribers": subscribers}
+                results.append(Result("fanout", params, metrics))
+    finally:
+        await notification_hub.stop()
+    return results
@@ -0,0 +1,49 @@
+"""Benchmarks de sérialisation : coût par message, de la ligne SQL à la trame envoyée"""
+
+from collections.abc import Callable
+from datetime import UTC, datetime
+
+from benchmarks.common import Result, per_op_metrics
+from config.constants import AVATARS, DEFAULT_ROOM
+from models.message import Message
+from routes.ws import encode_event
+from services import json_codec
+from services.message_service import MessageService
+from services.notification_hub import Event
+
+MESSAGE_LENGTHS = (80, 2000)
+
+
+def sample_message(length: int) -> Message:
+    return Message(
+        id=123456,
+        room_id=DEFAULT_ROOM,
+        username="alice",
+        avatar=AVATARS[0],
+        message=("Un message de test avec des accents : éàü. " * (length // 40 + 1))[:length],
+        is_bot=False,
+        timestamp=datetime(2025, 1, 1, 12, 0, tzinfo=UTC),
+    )
+
+
+def serialization_cases(message: Message) -> dict[str, Callable[[], object]]:
+    data = json_codec.dumps(message.to_dict())
+    event = Event("message", data, str(message.id), message.room_id)
+    return {
+        "serialize.to_dict": message.to_dict,
+        "serialize.json": lambda: json_codec.dumps(message.to_dict()),
+        "serialize.notify_payload": lambda: MessageService.build_notify_payload(message),
+        # Hub : décodage d'une notification reçue du broker
+        "serialize.parse_payload": lambda: json_codec.loads(data),
+        # Trames SSE et WebSocket d'un nouvel événement (construites une fois par message)
+        "serialize.sse_frame": lambda: Event(event.event, data, event.id, event.room).sse,
+        "serialize.ws_frame": lambda: encode_event.__wrapped__(event),
+    }
+
+
+def bench_serialization(repeat: int = 5) -> list[Result]:
+    results = []
+    for length in MESSAGE_LENGTHS:
+        for name, func in serialization_cases(sample_message(length)).items():
+            results.append(Result(name, {"length": length}, per_op_metrics(func, repeat)))
+    return results
@@ -1,3 +1,8 @@
+# Salon par défaut (messages antérieurs aux salons, clients sans salon)
+DEFAULT_ROOM = "general"
+# Identifiant de salon accepté dans les URLs et les requêtes
+ROOM_ID_PATTERN = r"^[\w-]{1,64}$"
+
 AVATARS = [
     "/static/images/1-icon-boy.png",
     "/static/images/1-icon-girl.png",
@@ -11,4 +16,4 @@ AVATARS = [
     "/static/images/5-icon-girl.png",
     "/static/images/6-icon-boy.png",
     "/static/images/6-icon-girl.png",
-]
\ No newline at end of file
+]
@@ -1,28 +1,58 @@
-from sqlalchemy import create_engine, event
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
 
 from config.settings import get_settings
 
 settings = get_settings()
 
-engine = create_engine(settings.database_url)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base()
+def to_async_url(url: str) -> str:
+    """Convertit une URL SQLAlchemy vers son driver asynchrone"""
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+psycopg://", 1)
+    return url
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def pool_options(url: str, pool_size: int, max_overflow: int) -> dict:
+    """Taille du pool de connexions ; SQLite garde le pool par défaut de son driver"""
+    if url.startswith("sqlite"):
+        return {}
+    return {"pool_size": pool_size, "max_overflow": max_overflow}
 
 
-# Setup PostgreSQL LISTEN/NOTIFY
-def setup_notification_listener(connection, *args, **kwargs):
-    connection.execute("LISTEN new_message;")
+# Moteur synchrone : réservé à Alembic et aux scripts hors application
+engine = create_engine(settings.database_url)
 
+# Moteur asynchrone utilisé par les routes et les services
+async_engine = create_async_engine(
+    to_async_url(settings.database_url),
+    **pool_options(
+        settings.database_url, settings.database_pool_size, settings.database_max_overflow
+    ),
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+# Réplique en lecture seule, avec son propre pool ; sans réplique, les lectures utilisent
+# le primaire (voir services.read_router)
+if settings.database_read_url:
+    read_engine = create_async_engine(
+        to_async_url(settings.database_read_url),
+        **pool_options(
+            settings.database_read_url,
+            settings.database_read_pool_size,
+            settings.database_read_max_overflow,
+        ),
+    )
+    ReadSessionLocal = async_sessionmaker(
+        bind=read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+else:
+    read_engine = async_engine
+    ReadSessionLocal = AsyncSessionLocal
 
-event.listen(engine, "connect", setup_notification_listener)
+Base = declarative_base()
@@ -8,7 +8,92 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 class Settings(BaseSettings):
     database_url: str
-    gemini_api_key: str
+    # Réplique en lecture seule (facultative) : historique, rattrapage et recherche y sont lus
+    # dès qu'elle contient les derniers messages attendus, sinon sur le primaire
+    database_read_url: str | None = None
+    # Pools de connexions (taille et dépassement autorisé) du primaire et de la réplique
+    database_pool_size: int = 5
+    database_max_overflow: int = 10
+    database_read_pool_size: int = 5
+    database_read_max_overflow: int = 10
+    # Délai (secondes) avant de réessayer une réplique injoignable
+    replica_retry_delay: float = 5.0
+    # Requise uniquement avec le fournisseur LLM gemini
+    gemini_api_key: str = ""
+
+    # Fournisseur LLM du bot et du simulateur : gemini ou stub (local, sans réseau)
+    llm_provider: str = "gemini"
+    llm_model: str = "gemini-2.5-flash"
+    # Enregistre les échanges (JSON Lines) pour les rejouer avec le stub
+    llm_record_path: str | None = None
+    # Stub : réponses enregistrées, latence du premier token (médiane et sigma log-normal,
+    # secondes), débit (tokens/s, moyenne et écart-type), longueur des réponses synthétiques
+    llm_stub_responses: str | None = None
+    llm_stub_latency: float = 0.5
+    llm_stub_latency_sigma: float = 0.5
+    llm_stub_tokens_per_second: float = 50.0
+    llm_stub_tokens_per_second_stddev: float = 10.0
+    llm_stub_response_tokens: int = 60
+    llm_stub_seed: int = 0
+    # Broker d'événements entre workers : memory (un seul processus), postgres ou socket
+    # (par défaut : postgres si la base est PostgreSQL, memory sinon)
+    broker: str | None = None
+    # Adresse du processus broker local (broker socket, `pdm run broker`)
+    broker_host: str = "127.0.0.1"
+    broker_port: int = 8100
+    # Nombre de workers uvicorn (le broker memory n'en supporte qu'un)
+    web_concurrency: int = 1
+    # Connexion au broker : délais de reconnexion (secondes)
+    notify_reconnect_delay: float = 1.0
+    notify_reconnect_max_delay: float = 30.0
+    # Nombre de messages sérialisés gardés en mémoire par worker
+    message_cache_size: int = 1024
+    # Flux d'événements : événements en attente par client avant de le déconnecter (il reprend
+    # depuis son dernier ID), délai maximal d'envoi d'une trame (secondes)
+    subscriber_queue_size: int = 256
+    stream_send_timeout: float = 30.0
+    # SSE : intervalle des commentaires de maintien de connexion (secondes) et délai de
+    # reconnexion suggéré au navigateur (millisecondes)
+    sse_ping_interval: int = 15
+    sse_retry_ms: int = 2000
+    # Rattrapage des reconnexions : messages gardés en mémoire par salon et nombre de salons
+    # (par worker) ; au-delà, lecture en DB par pages, plafonnée aux messages les plus récents
+    replay_buffer_size: int = 256
+    replay_buffer_rooms: int = 1024
+    catch_up_page_size: int = 100
+    catch_up_max_messages: int = 1000
+    # Rétention (`pdm run archive`) : âge en jours au-delà duquel un message est déplacé vers
+    # la table d'archive, et messages déplacés par transaction
+    message_retention_days: int = 90
+    archive_batch_size: int = 1000
+    # Délai (secondes) avant de revérifier l'archive d'un salon trouvée vide (par worker)
+    archive_recheck_interval: float = 60.0
+    # Taille d'une page d'historique (page de chat et /api/messages)
+    history_page_size: int = 30
+    # Nombre de salons dont l'historique récent est gardé en mémoire par worker (page de chat)
+    history_cache_rooms: int = 256
+    # Group commit des messages : fenêtre de regroupement (secondes) et taille maximale d'un lot
+    message_write_window: float = 0.005
+    message_write_max_batch: int = 100
+    # Indicateur « en train d'écrire » : durée de vie et intervalle de diffusion (secondes)
+    typing_ttl: float = 5.0
+    typing_broadcast_interval: float = 0.5
+    # File de réponses du bot : concurrence, taille, délai maximal et tentatives par appel LLM
+    bot_concurrency: int = 4
+    bot_queue_size: int = 100
+    bot_timeout: float = 30.0
+    bot_max_retries: int = 2
+    bot_retry_delay: float = 1.0
+    # Cache des réponses du bot : taille, durée de vie (secondes) et messages pris en compte
+    bot_cache_size: int = 256
+    bot_cache_ttl: float = 60.0
+    bot_cache_context_size: int = 5
+    # Contexte glissant du bot : budget de tokens et délai minimal (secondes) entre deux
+    # rafraîchissements du résumé d'un salon (à la demande, lors d'une réponse du bot)
+    bot_context_token_budget: int = 1500
+    bot_context_summary_interval: float = 30.0
+    # Nombre de salons dont le bot garde le contexte en mémoire (par worker)
+    bot_context_rooms: int = 256
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,448 @@
+"""Générateur de charge HTTP/SSE (sans navigateur)
+
+Chaque utilisateur virtuel ouvre un flux SSE sur son salon et envoie des messages
+via POST /api/messages. Chaque message porte un marqueur : à sa réception sur
+un flux SSE, la latence de bout en bout envoi → réception est mesurée.
+
+Exemples :
+    pdm run load --profile ramp
+    pdm run load --profile 30s:500,2m:5000,30s:0 --rooms 50 --json report.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import random
+import re
+import time
+from dataclasses import dataclass, field
+
+import httpx
+
+# Profils prédéfinis : paliers (durée en secondes, nombre d'utilisateurs visé en fin de palier)
+PROFILES: dict[str, list[tuple[float, int]]] = {
+    "smoke": [(10, 10), (20, 10), (5, 0)],
+    "ramp": [(60, 1000), (120, 1000), (30, 0)],
+    "stress": [(60, 1000), (60, 2500), (60, 5000), (120, 5000), (30, 0)],
+    "spike": [(10, 100), (10, 5000), (60, 5000), (10, 100), (30, 100)],
+}
+
+MARKER_PREFIX = "[lg "
+_MARKER = re.compile(r"^\[lg (\S+)\]")
+_DURATION = re.compile(r"^(\d+(?:\.\d+)?)(ms|s|m|h)?$")
+_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, None: 1}
+
+WORDS = (
+    "bonjour",
+    "salut",
+    "oui",
+    "non",
+    "peut-être",
+    "demain",
+    "réunion",
+    "projet",
+    "idée",
+    "question",
+    "réponse",
+    "merci",
+    "café",
+    "déploiement",
+    "test",
+    "serveur",
+    "salon",
+    "équipe",
+    "planning",
+)
+
+
+def parse_duration(value: str) -> float:
+    match = _DURATION.match(value.strip())
+    if match is None:
+        raise ValueError(f"Durée invalide: {value!r}")
+    return float(match.group(1)) * _UNITS[match.group(2)]
+
+
+def parse_profile(value: str) -> list[tuple[float, int]]:
+    """Profil nommé, ou liste de paliers `durée:utilisateurs` (ex. `30s:100,2m:1000,30s:0`)"""
+    if value in PROFILES:
+        return PROFILES[value]
+    stages = []
+    for stage in value.split(","):
+        duration, separator, users = stage.partition(":")
+        if not separator:
+            raise ValueError(f"Palier invalide (attendu `durée:utilisateurs`): {stage!r}")
+        count = int(users)
+        if count < 0:
+            raise ValueError(f"Nombre d'utilisateurs négatif: {stage!r}")
+        stages.append((parse_duration(duration), count))
+    return stages
+
+
+class LatencyRecorder:
+    """Échantillons de latence (échantillonnage par réservoir : mémoire bornée)"""
+
+    def __init__(self, capacity: int = 100_000):
+        self.capacity = capacity
+        self.count = 0
+        self.samples: list[float] = []
+
+    def record(self, value: float) -> None:
+        self.count += 1
+        if len(self.samples) < self.capacity:
+            self.samples.append(value)
+            return
+        index = random.randrange(self.count)
+        if index < self.capacity:
+            self.samples[index] = value
+
+    def percentiles(self, *quantiles: float) -> dict[str, float | None]:
+        ordered = sorted(self.samples)
+        result: dict[str, float | None] = {}
+        for quantile in quantiles:
+            key = f"p{quantile * 100:g}"
+            if not ordered:
+                result[key] = None
+                continue
+            index = min(len(ordered) - 1, int(quantile * len(ordered)))
+            result[key] = round(ordered[index] * 1000, 2)
+        return result
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            **self.percentiles(0.5, 0.9, 0.95, 0.99, 0.999),
+            "max": round(max(self.samples) * 1000, 2) if self.samples else None,
+        }
+
+
+@dataclass
+class LoadStats:
+    """Compteurs partagés par tous les utilisateurs virtuels"""
+
+    sent: int = 0
+    send_errors: int = 0
+    received: int = 0
+    stream_errors: int = 0
+    disconnects: int = 0
+    errors: dict[str, int] = field(default_factory=dict)
+    send_latency: LatencyRecorder = field(default_factory=LatencyRecorder)
+    delivery_latency: LatencyRecorder = field(default_factory=LatencyRecorder)
+    # Latences de la dernière fenêtre d'affichage
+    window_latency: list[float] = field(default_factory=list)
+
+    def error(self, kind: str) -> None:
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+
+class LoadGenerator:
+    """Pilote les utilisateurs virtuels selon un profil de montée en charge"""
+
+    def __init__(
+        self,
+        base_url: str,
+        stages: list[tuple[float, int]],
+        rooms: int = 1,
+        send_interval: float = 10.0,
+        report_interval: float = 5.0,
+        reconnect_delay: float = 1.0,
+    ):
+        self.base_url = base_url
+        self.stages = stages
+        self.rooms = [f"load-{i}" for i in range(rooms)]
+        self.send_interval = send_interval
+        self.report_interval = report_interval
+        self.reconnect_delay = reconnect_delay
+        self.stats = LoadStats()
+        # Instant d'envoi de chaque marqueur, pour la latence de bout en bout
+        self.sent_at: dict[str, float] = {}
+        self.users: list[asyncio.Task] = []
+        self.max_users = 0
+        self._next_user_id = itertools.count()
+        self.client: httpx.AsyncClient = None  # type: ignore
+
+    def on_data(self, data: str) -> None:
+        """Données d'un événement SSE : mesure la latence des messages marqués"""
+        if MARKER_PREFIX not in data:
+            return
+        try:
+            message = json.loads(data).get("message", "")
+        except ValueError:
+            return
+        match = _MARKER.match(message)
+        if match is None:
+            return
+        sent_at = self.sent_at.get(match.group(1))
+        if sent_at is None:
+            return
+        latency = time.perf_counter() - sent_at
+        self.stats.received += 1
+        self.stats.delivery_latency.record(latency)
+        self.stats.window_latency.append(latency)
+
+    def target_users(self, elapsed: float) -> int | None:
+        """Nombre d'utilisateurs visé à cet instant (interpolation linéaire par palier)"""
+        start_users = 0
+        for duration, users in self.stages:
+            if elapsed < duration:
+                return round(start_users + (users - start_users) * elapsed / duration)
+            elapsed -= duration
+            start_users = users
+        return None
+
+    def scale_to(self, target: int) -> None:
+        self.users = [task for task in self.users if not task.done()]
+        while len(self.users) < target:
+            user_id = next(self._next_user_id)
+            user = VirtualUser(user_id, self.rooms[user_id % len(self.rooms)], self)
+            self.users.append(asyncio.create_task(user.run()))
+        while len(self.users) > target:
+            self.users.pop().cancel()
+        self.max_users = max(self.max_users, len(self.users))
+
+    async def run(self) -> dict:
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        async with httpx.AsyncClient(
+            base_url=self.base_url, limits=limits, timeout=httpx.Timeout(30.0)
+        ) as self.client:
+            started = time.monotonic()
+            reporter = asyncio.create_task(self._report_forever())
+            try:
+                while (target := self.target_users(time.monotonic() - started)) is not None:
+                    self.scale_to(target)
+                    self._expire_markers()
+                    await asyncio.sleep(0.2)
+            finally:
+                reporter.cancel()
+                remaining = list(self.users)
+                self.scale_to(0)
+                await asyncio.gather(*remaining, return_exceptions=True)
+            return self.report(time.monotonic() - started)
+
+    def _expire_markers(self, max_age: float = 60.0) -> None:
+        # Les dicts gardent l'ordre d'insertion : les marqueurs les plus anciens sont en tête
+        limit = time.perf_counter() - max_age
+        for token, sent_at in list(itertools.islice(self.sent_at.items(), 1000)):
+            if sent_at > limit:
+                break
+            del self.sent_at[token]
+
+    async def _report_forever(self) -> None:
+        stats = self.stats
+        last_sent = last_received = 0
+        while True:
+            await asyncio.sleep(self.report_interval)
+            window = sorted(stats.window_latency)
+            stats.window_latency = []
+            p50 = f"{window[len(window) // 2] * 1000:.0f}ms" if window else "-"
+            p99 = f"{window[int(len(window) * 0.99)] * 1000:.0f}ms" if window else "-"
+            active = sum(1 for task in self.users if not task.done())
+            print(
+                f"👥 {active:>5} utilisateurs | "
+                f"📤 {(stats.sent - last_sent) / self.report_interval:>7.1f} msg/s | "
+                f"📥 {(stats.received - last_received) / self.report_interval:>8.1f} livr./s | "
+                f"⏱️ p50 {p50} p99 {p99} | "
+                f"❌ {stats.send_errors + stats.stream_errors}"
+            )
+            last_sent, last_received = stats.sent, stats.received
+
+    def report(self, elapsed: float) -> dict:
+        stats = self.stats
+        attempts = stats.sent + stats.send_errors
+        return {
+            "duration_s": round(elapsed, 1),
+            "max_users": self.max_users,
+            "rooms": len(self.rooms),
+            "messages_sent": stats.sent,
+            "deliveries": stats.received,
+            "send_throughput_per_s": round(stats.sent / elapsed, 1) if elapsed else 0,
+            "delivery_throughput_per_s": round(stats.received / elapsed, 1) if elapsed else 0,
+            "send_error_rate": round(stats.send_errors / attempts, 4) if attempts else 0,
+            "stream_errors": stats.stream_errors,
+            "stream_disconnects": stats.disconnects,
+            "errors": stats.errors,
+            "send_latency_ms": stats.send_latency.summary(),
+            "delivery_latency_ms": stats.delivery_latency.summary(),
+        }
+
+
+class VirtualUser:
+    """Utilisateur virtuel : un flux SSE et des envois périodiques"""
+
+    def __init__(
+        self,
+        user_id: int,
+        room: str,
+        generator: LoadGenerator,
+    ):
+        self.user_id = user_id
+        self.username = f"vu-{user_id}"
+        self.room = room
+        self.generator = generator
+        self.connected = asyncio.Event()
+        self._sequence = itertools.count()
+
+    async def run(self) -> None:
+        listener = asyncio.create_task(self.listen())
+        try:
+            # N'envoyer qu'une fois abonné, pour mesurer la livraison et non l'abonnement
+            await self.connected.wait()
+            await self.send_forever()
+        finally:
+            listener.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await listener
+
+    async def listen(self) -> None:
+        generator = self.generator
+        stats = generator.stats
+        while True:
+            try:
+                async with generator.client.stream(
+                    "GET", "/api/stream", params={"room": self.room}, timeout=None
+                ) as response:
+                    response.raise_for_status()
+                    self.connected.set()
+                    async for line in response.aiter_lines():
+                        if line.startswith("data:"):
+                            generator.on_data(line[5:].strip())
+                stats.disconnects += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                stats.stream_errors += 1
+                stats.error(f"stream:{type(e).__name__}")
+            await asyncio.sleep(generator.reconnect_delay)
+
+    async def send_forever(self) -> None:
+        generator = self.generator
+        stats = generator.stats
+        while True:
+            # Arrivées poissonniennes : intervalle exponentiel autour de la moyenne
+            await asyncio.sleep(random.expovariate(1 / generator.send_interval))
+            token = f"{self.user_id}.{next(self._sequence)}"
+            text = " ".join(random.choices(WORDS, k=random.randint(3, 12)))
+            payload = {
+                "room_id": self.room,
+                "username": self.username,
+                "avatar": "/static/images/1-icon-boy.png",
+                "message": f"{MARKER_PREFIX}{token}] {text}",
+            }
+
+            started = time.perf_counter()
+            generator.sent_at[token] = started
+            try:
+                response = await generator.client.post("/api/messages", json=payload)
+                response.raise_for_status()
+            except asyncio.CancelledError:
+                raise
+            except httpx.HTTPStatusError as e:
+                stats.send_errors += 1
+                stats.error(f"send:{e.response.status_code}")
+                generator.sent_at.pop(token, None)
+                continue
+            except Exception as e:
+                stats.send_errors += 1
+                stats.error(f"send:{type(e).__name__}")
+                generator.sent_at.pop(token, None)
+                continue
+            stats.sent += 1
+            stats.send_latency.record(time.perf_counter() - started)
+
+
+def print_report(report: dict) -> None:
+    print("\n📊 Résultats")
+    print(f"   Durée               : {report['duration_s']}s")
+    print(f"   Utilisateurs (max)  : {report['max_users']} sur {report['rooms']} salon(s)")
+    print(
+        f"   Messages envoyés    : {report['messages_sent']} "
+        f"({report['send_throughput_per_s']} msg/s)"
+    )
+    print(
+        f"   Livraisons SSE      : {report['deliveries']} "
+        f"({report['delivery_throughput_per_s']} livr./s)"
+    )
+    print(f"   Taux d'erreur envoi : {report['send_error_rate']:.2%}")
+    print(
+        f"   Erreurs de flux     : {report['stream_errors']} "
+        f"(déconnexions : {report['stream_disconnects']})"
+    )
+    for name, key in (("POST", "send_latency_ms"), ("Envoi → réception", "delivery_latency_ms")):
+        latency = report[key]
+        values = " ".join(f"{k}={v}" for k, v in latency.items() if k != "count" and v is not None)
+        print(f"   Latence {name} (ms) : {values or '-'}")
+    if report["errors"]:
+        print(f"   Détail des erreurs  : {report['errors']}")
+
+
+def profile_arg(value: str) -> str:
+    """Type argparse : profil valide (voir `parse_profile`), erreur argparse sinon"""
+    try:
+        parse_profile(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f"profil invalide : {e}") from e
+    return value
+
+
+def positive_int(value: str) -> int:
+    """Type argparse : entier strictement positif"""
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"doit être strictement positif : {value}")
+    return number
+
+
+def positive_float(value: str) -> float:
+    """Type argparse : nombre strictement positif (un intervalle nul boucle sans attendre)"""
+    number = float(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"doit être strictement positif : {value}")
+    return number
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Générateur de charge HTTP/SSE pour ChatX")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument(
+        "--profile",
+        type=profile_arg,
+        default="smoke",
+        help=f"Profil prédéfini ({', '.join(PROFILES)}) ou paliers `durée:utilisateurs,...`",
+    )
+    parser.add_argument("--rooms", type=positive_int, default=1, help="Nombre de salons")
+    parser.add_argument(
+        "--send-interval",
+        type=positive_float,
+        default=10.0,
+        help="Intervalle moyen entre deux envois d'un utilisateur (secondes)",
+    )
+    parser.add_argument("--report-interval", type=positive_float, default=5.0)
+    parser.add_argument("--json", dest="json_path", help="Écrire le rapport JSON dans ce fichier")
+    return parser.parse_args()
+
+
+async def main():
+    """Point d'entrée principal"""
+    args = parse_args()
+    generator = LoadGenerator(
+        base_url=args.base_url,
+        stages=parse_profile(args.profile),
+        rooms=args.rooms,
+        send_interval=args.send_interval,
+        report_interval=args.report_interval,
+    )
+
+    total = sum(duration for duration, _ in generator.stages)
+    print(f"🚀 Charge sur {args.base_url} : profil {args.profile} ({total:.0f}s)")
+    report = await generator.run()
+    print_report(report)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"📝 Rapport sauvegardé dans {args.json_path}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,17 +1,60 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 
+from config.database import async_engine, read_engine
+from config.settings import get_settings
 from routes.chat import router as chat_router
+from routes.metrics import router as metrics_router
 from routes.sse import router as sse_router
+from routes.ws import router as ws_router
+from services.bot_worker import bot_worker_pool
+from services.broker import broker_name
+from services.conversation_context import context_store
+from services.history_cache import history_cache
+from services.notification_hub import notification_hub
+from services.replay_buffer import replay_buffer
+from services.typing_service import typing_service
+
+settings = get_settings()
+
 
-app = FastAPI(title="Chat App")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Démarre et arrête les services partagés du worker"""
+    await notification_hub.start()
+    await typing_service.start()
+    await history_cache.start()
+    await replay_buffer.start()
+    await context_store.start()
+    await bot_worker_pool.start()
+    yield
+    await bot_worker_pool.stop()
+    await typing_service.stop()
+    await notification_hub.stop()
+    # Fermer les connexions du pool (les threads aiosqlite empêchent sinon l'arrêt)
+    await async_engine.dispose()
+    if read_engine is not async_engine:
+        await read_engine.dispose()
+
+
+app = FastAPI(title="Chat App", lifespan=lifespan)
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 app.include_router(chat_router)
 app.include_router(sse_router)
+app.include_router(ws_router)
+app.include_router(metrics_router)
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=1)
+
+    if broker_name() == "memory" and settings.web_concurrency > 1:
+        raise SystemExit(
+            "❌ Le broker memory ne relie pas les workers entre eux : "
+            "utilisez BROKER=postgres ou BROKER=socket avec WEB_CONCURRENCY > 1"
+        )
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=settings.web_concurrency)
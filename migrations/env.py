@@ -31,6 +31,15 @@ target_metadata = Base.metadata
 # ... etc.
 
 
+# Index de recherche plein texte créés par migration, absents des modèles : à ignorer
+# par l'autogénération (colonne tsvector et index GIN, tables FTS5 de SQLite)
+SEARCH_OBJECTS = ("search_vector", "ix_messages_search_vector")
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    return not (name in SEARCH_OBJECTS or (type_ == "table" and name.startswith("messages_fts")))
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -47,6 +56,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -69,7 +79,9 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(
+            connection=connection, target_metadata=target_metadata, include_object=include_object
+        )
 
         with context.begin_transaction():
             context.run_migrations()
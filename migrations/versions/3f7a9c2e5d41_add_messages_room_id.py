@@ -0,0 +1,35 @@
+"""Add messages room_id
+
+Revision ID: 3f7a9c2e5d41
+Revises: 8c1d2f6a9b3e
+Create Date: 2026-10-18 14:03:27.502611
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3f7a9c2e5d41"
+down_revision: str | Sequence[str] | None = "8c1d2f6a9b3e"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Les messages existants rejoignent le salon par défaut
+    op.add_column(
+        "messages",
+        sa.Column("room_id", sa.String(length=64), server_default="general", nullable=False),
+    )
+    # Historique et rattrapage par salon : WHERE room_id = ? ORDER BY id
+    op.create_index("ix_messages_room_id_id", "messages", ["room_id", "id"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_messages_room_id_id", table_name="messages")
+    op.drop_column("messages", "room_id")
@@ -0,0 +1,46 @@
+"""Add messages archive
+
+Revision ID: 5b8e2d7c1a94
+Revises: 3f7a9c2e5d41
+Create Date: 2026-10-18 16:42:09.184733
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5b8e2d7c1a94"
+down_revision: str | Sequence[str] | None = "3f7a9c2e5d41"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Messages archivés par la rétention ; sous PostgreSQL, partitionnés par mois sur
+    # timestamp (partitions créées par le job d'archivage)
+    op.create_table(
+        "messages_archive",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("timestamp", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("room_id", sa.String(length=64), server_default="general", nullable=False),
+        sa.Column("username", sa.String(length=100), nullable=False),
+        sa.Column("avatar", sa.String(length=255), nullable=False),
+        sa.Column("message", sa.Text(), nullable=False),
+        sa.Column("is_bot", sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint("id", "timestamp"),
+        postgresql_partition_by="RANGE (timestamp)",
+    )
+    # Historique paginé par salon, au-delà des messages récents
+    op.create_index(
+        "ix_messages_archive_room_id_id", "messages_archive", ["room_id", "id"], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_messages_archive_room_id_id", table_name="messages_archive")
+    op.drop_table("messages_archive")
@@ -0,0 +1,77 @@
+"""Add messages search index
+
+Revision ID: 7d3f9b2a6c15
+Revises: 5b8e2d7c1a94
+Create Date: 2026-10-18 18:27:53.641092
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "7d3f9b2a6c15"
+down_revision: str | Sequence[str] | None = "5b8e2d7c1a94"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == "postgresql":
+        # tsvector calculé par PostgreSQL à chaque insertion (réécrit la table existante)
+        op.add_column(
+            "messages",
+            sa.Column(
+                "search_vector",
+                postgresql.TSVECTOR(),
+                sa.Computed("to_tsvector('simple', message)", persisted=True),
+            ),
+        )
+        op.create_index(
+            "ix_messages_search_vector",
+            "messages",
+            ["search_vector"],
+            unique=False,
+            postgresql_using="gin",
+        )
+        return
+
+    # SQLite : index FTS5 sur le contenu de messages, tenu à jour par des triggers
+    op.execute(
+        "CREATE VIRTUAL TABLE messages_fts USING fts5(message, content='messages', "
+        "content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+    )
+    op.execute(
+        "CREATE TRIGGER messages_fts_insert AFTER INSERT ON messages BEGIN "
+        "INSERT INTO messages_fts(rowid, message) VALUES (new.id, new.message); END"
+    )
+    op.execute(
+        "CREATE TRIGGER messages_fts_delete AFTER DELETE ON messages BEGIN "
+        "INSERT INTO messages_fts(messages_fts, rowid, message) "
+        "VALUES ('delete', old.id, old.message); END"
+    )
+    op.execute(
+        "CREATE TRIGGER messages_fts_update AFTER UPDATE OF message ON messages BEGIN "
+        "INSERT INTO messages_fts(messages_fts, rowid, message) "
+        "VALUES ('delete', old.id, old.message); "
+        "INSERT INTO messages_fts(rowid, message) VALUES (new.id, new.message); END"
+    )
+    # Indexer les messages existants
+    op.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index("ix_messages_search_vector", table_name="messages")
+        op.drop_column("messages", "search_vector")
+        return
+
+    op.execute("DROP TRIGGER messages_fts_update")
+    op.execute("DROP TRIGGER messages_fts_delete")
+    op.execute("DROP TRIGGER messages_fts_insert")
+    op.execute("DROP TABLE messages_fts")
@@ -0,0 +1,28 @@
+"""Add messages timestamp/id index
+
+Revision ID: 8c1d2f6a9b3e
+Revises: 4eee97b10874
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8c1d2f6a9b3e"
+down_revision: str | Sequence[str] | None = "4eee97b10874"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Index composite pour la pagination keyset de l'historique
+    op.create_index("ix_messages_timestamp_id", "messages", ["timestamp", "id"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_messages_timestamp_id", table_name="messages")
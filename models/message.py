@@ -1,24 +1,54 @@
-from sqlalchemy import Boolean, Column, DateTime, Integer, String, Text, func
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, String, Text, func
 
+from config.constants import DEFAULT_ROOM
 from config.database import Base
 
 
-class Message(Base):
-    __tablename__ = "messages"
+class MessageMixin:
+    """Colonnes et sérialisation communes aux messages récents et archivés"""
 
-    id = Column(Integer, primary_key=True, index=True)
+    room_id = Column(String(64), nullable=False, default=DEFAULT_ROOM, server_default=DEFAULT_ROOM)
     username = Column(String(100), nullable=False)
     avatar = Column(String(255), nullable=False)
     message = Column(Text, nullable=False)
     is_bot = Column(Boolean, default=False)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now())
 
     def to_dict(self):
         return {
             "id": self.id,
+            "room_id": self.room_id,
             "username": self.username,
             "avatar": self.avatar,
             "message": self.message,
             "is_bot": self.is_bot,
-            "timestamp": self.timestamp.isoformat() if self.timestamp else None # type: ignore
-        }
\ No newline at end of file
+            "timestamp": self.timestamp.isoformat() if self.timestamp else None,  # type: ignore
+        }
+
+
+class Message(MessageMixin, Base):
+    __tablename__ = "messages"
+    __table_args__ = (
+        Index("ix_messages_timestamp_id", "timestamp", "id"),
+        Index("ix_messages_room_id_id", "room_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    timestamp = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ArchivedMessage(MessageMixin, Base):
+    """Message déplacé hors de la table `messages` par la rétention (services.retention)
+
+    Sous PostgreSQL, la table est partitionnée par mois sur `timestamp` : une partition
+    ancienne peut être détachée ou supprimée sans toucher aux autres.
+    """
+
+    __tablename__ = "messages_archive"
+    __table_args__ = (
+        Index("ix_messages_archive_room_id_id", "room_id", "id"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+
+    # La clé de partitionnement doit faire partie de la clé primaire
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    timestamp = Column(DateTime(timezone=True), primary_key=True)
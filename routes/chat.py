@@ -1,19 +1,32 @@
-import json
+from collections.abc import AsyncIterator
 
-from fastapi import APIRouter, BackgroundTasks, Depends, Form, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi import APIRouter, Form, Query, Request
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
-from sqlalchemy import text
-from sqlalchemy.orm import Session
+from markupsafe import Markup
 
-from config.constants import AVATARS
-from config.database import get_db
+from config.constants import AVATARS, DEFAULT_ROOM, ROOM_ID_PATTERN
+from config.settings import get_settings
 from schemas.message import MessageCreate, TypingEvent
-from services.bot_service import BotService
+from services.bot_service import bot_service
+from services.bot_worker import bot_worker_pool
+from services.chat_service import ChatService
+from services.history_cache import history_cache
 from services.message_service import MessageService
+from services.read_router import read_router
+from services.typing_service import typing_service
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
+settings = get_settings()
+
+# Taille maximale d'une page d'historique demandée par un client
+MAX_HISTORY_PAGE_SIZE = 100
+# Recherche : taille maximale d'une page et profondeur maximale de pagination
+MAX_SEARCH_PAGE_SIZE = 50
+MAX_SEARCH_OFFSET = 1000
+# Emplacement de l'historique dans la page de chat, envoyé après le reste de la coquille
+HISTORY_MARKER = "<!-- history -->"
 
 
 @router.get("/", response_class=HTMLResponse)
@@ -31,65 +44,95 @@ async def join_chat(username: str = Form(...), avatar: str = Form(...)):
     return response
 
 
+async def render_chat_page(head: str, tail: str, room: str, username: str) -> AsyncIterator[str]:
+    """Envoie la coquille de la page, puis l'historique (cache mémoire), puis la fin"""
+    yield head
+    try:
+        messages, has_more = await history_cache.get(room)
+    except Exception as e:
+        # La page reste utilisable : les messages en direct arriveront par le flux
+        print(f"❌ Erreur lors du chargement de l'historique: {e}")
+        messages, has_more = [], False
+    yield templates.get_template("chat_history.html").render(
+        messages=messages, has_more=has_more, username=username
+    )
+    yield tail
+
+
 @router.get("/chat", response_class=HTMLResponse)
-async def chat_page(request: Request, db: Session = Depends(get_db)):  # noqa: B008
-    """Page de chat"""
+async def chat_page(
+    request: Request,
+    room: str = Query(default=DEFAULT_ROOM, pattern=ROOM_ID_PATTERN),  # noqa: B008
+):
+    """Page de chat d'un salon, envoyée en streaming : la coquille part avant l'historique"""
     username = request.cookies.get("username")
     avatar = request.cookies.get("avatar")
 
     if not username or not avatar:
         return RedirectResponse(url="/")
 
-    messages = MessageService.get_recent_messages(db)
-
-    return templates.TemplateResponse(
-        "chat.html",
-        {"request": request, "username": username, "avatar": avatar, "messages": messages},
+    shell = templates.get_template("chat.html").render(
+        request=request,
+        username=username,
+        avatar=avatar,
+        room=room,
+        history=Markup(HISTORY_MARKER),
     )
+    head, tail = shell.split(HISTORY_MARKER, 1)
+    return StreamingResponse(render_chat_page(head, tail, room, username), media_type="text/html")
 
 
-@router.post("/api/messages")
-async def send_message(
-    message_data: MessageCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)  # noqa: B008
+@router.get("/api/messages")
+async def list_messages(
+    room: str = Query(default=DEFAULT_ROOM, pattern=ROOM_ID_PATTERN),  # noqa: B008
+    before_id: int | None = None,
+    limit: int | None = Query(default=None, ge=1, le=MAX_HISTORY_PAGE_SIZE),  # noqa: B008
 ):
-    """Envoyer un message et déclencher une réponse bot en arrière-plan"""
-    # Créer le message utilisateur immédiatement
-    user_message = MessageService.create_message(db, message_data)
-
-    bot_service = BotService()
-
-    # Vérifier si le bot doit répondre
-    if bot_service.should_respond(message_data.message):
-        # Ajouter la génération de réponse en tâche d'arrière-plan
-        background_tasks.add_task(
-            bot_service.process_bot_response,
-            db=db,
-            message=message_data.message,
-            username=message_data.username,
-            message_service=MessageService,
+    """Historique paginé (keyset) d'un salon : les messages antérieurs à `before_id`"""
+    # Première page : elle doit contenir les derniers messages validés
+    min_id = before_id if before_id is not None else read_router.latest_id
+    async with read_router.session(min_id) as db:
+        messages, has_more = await MessageService.get_messages_page(
+            db, room, before_id=before_id, limit=limit or settings.history_page_size
+        )
+    return {"messages": [msg.to_dict() for msg in messages], "has_more": has_more}
+
+
+@router.get("/api/search")
+async def search_messages(
+    q: str = Query(min_length=1, max_length=200),  # noqa: B008
+    room: str = Query(default=DEFAULT_ROOM, pattern=ROOM_ID_PATTERN),  # noqa: B008
+    offset: int = Query(default=0, ge=0, le=MAX_SEARCH_OFFSET),  # noqa: B008
+    limit: int = Query(default=20, ge=1, le=MAX_SEARCH_PAGE_SIZE),  # noqa: B008
+):
+    """Recherche plein texte dans un salon : messages par pertinence, pagination par offset"""
+    # Un léger retard de la réplique est acceptable pour une recherche
+    async with read_router.session() as db:
+        messages, has_more = await MessageService.search_messages(
+            db, q, room, offset=offset, limit=limit
         )
+    return {"messages": [msg.to_dict() for msg in messages], "has_more": has_more}
+
+
+@router.post("/api/messages")
+async def send_message(message_data: MessageCreate):
+    """Envoyer un message et déclencher une réponse bot en arrière-plan"""
+    user_message = await ChatService.post_message(message_data)
 
     # Retourner immédiatement la réponse sans attendre le bot
     return {"status": "success", "message": user_message.to_dict()}
 
 
-@router.post("/api/typing")
-async def send_typing(typing_event: TypingEvent, db: Session = Depends(get_db)) -> dict[str, str]:  # noqa: B008
-    """Envoyer un événement typing"""
-    try:
-        typing_data = json.dumps(
-            {
-                "username": typing_event.username,
-                "avatar": typing_event.avatar,
-                "is_typing": typing_event.is_typing,
-            }
-        )
+@router.get("/api/bot/status")
+async def bot_status() -> dict:
+    """État de la file du bot (profondeur, jobs en cours, compteurs) et de son cache"""
+    return {**bot_worker_pool.stats(), "cache": bot_service.cache.stats()}
 
-        # Envoyer la notification via PostgreSQL
-        db.execute(text("SELECT pg_notify('typing_event', :data)"), {"data": typing_data})
-        db.commit()
 
-        return {"status": "success"}
-    except Exception as e:
-        print(f"❌ Erreur typing: {e}")
-        return {"status": "error", "message": str(e)}
+@router.post("/api/typing")
+async def send_typing(typing_event: TypingEvent) -> dict[str, str]:
+    """Envoyer un événement typing (état en mémoire, diffusé de façon agrégée)"""
+    await typing_service.update(
+        typing_event.room_id, typing_event.username, typing_event.avatar, typing_event.is_typing
+    )
+    return {"status": "success"}
@@ -0,0 +1,53 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from services.bot_service import bot_service
+from services.bot_worker import bot_worker_pool
+from services.metrics import registry
+from services.notification_hub import notification_hub
+
+router = APIRouter()
+
+# État des services lu à chaque collecte (aucun coût sur le chemin critique)
+registry.callback(
+    "chatx_hub_subscribers",
+    "Abonnés du hub (flux SSE et WebSocket)",
+    lambda: notification_hub.subscriber_count,
+)
+registry.callback(
+    "chatx_hub_rooms", "Salons ayant au moins un abonné", lambda: notification_hub.room_count
+)
+registry.callback(
+    "chatx_bot_queue_depth",
+    "Demandes en attente dans la file du bot",
+    lambda: bot_worker_pool.queue_depth,
+)
+registry.callback(
+    "chatx_bot_active_jobs",
+    "Réponses du bot en cours de génération",
+    lambda: bot_worker_pool.active_jobs,
+)
+registry.callback(
+    "chatx_bot_jobs_total",
+    "Demandes traitées par le bot, par issue",
+    lambda: {
+        ("processed",): bot_worker_pool.processed,
+        ("failed",): bot_worker_pool.failed,
+        ("rejected",): bot_worker_pool.rejected,
+    },
+    metric_type="counter",
+    labelnames=("status",),
+)
+registry.callback(
+    "chatx_bot_cache_lookups_total",
+    "Consultations du cache de réponses du bot, par résultat",
+    lambda: {("hit",): bot_service.cache.hits, ("miss",): bot_service.cache.misses},
+    metric_type="counter",
+    labelnames=("result",),
+)
+
+
+@router.get("/metrics")
+async def metrics():
+    """Métriques du worker au format texte Prometheus"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -1,119 +1,80 @@
 import asyncio
-import json
+import time
 from collections.abc import AsyncGenerator
 
-import psycopg
-from fastapi import APIRouter, Request
-from sse_starlette.sse import EventSourceResponse
+from fastapi import APIRouter, Query, Request
+from sse_starlette import ServerSentEvent
+from sse_starlette.sse import EventSourceResponse, SendTimeoutError
 
+from config.constants import DEFAULT_ROOM, ROOM_ID_PATTERN
 from config.settings import get_settings
-from services.message_service import MessageService
+from services.event_stream import room_events
+from services.metrics import clients, delivery_lag, slow_consumers
+from services.notification_hub import SubscriberLagging
 
-router = APIRouter()
 settings = get_settings()
 
+router = APIRouter()
 
-def strip_psycopg_dialect(url: str) -> str:
-    if "+psycopg" in url:
-        return url.replace("+psycopg", "")
-    return url
 
+class ChatEventSourceResponse(EventSourceResponse):
+    """EventSourceResponse qui ferme sans erreur la connexion d'un client bloqué
 
-async def message_stream(last_event_id: str | None = None) -> AsyncGenerator:
-    """Stream de messages via SSE avec PostgreSQL NOTIFY/LISTEN (psycopg v3)"""
+    Une trame dont l'envoi dépasse `send_timeout` (client qui ne lit plus) met fin au
+    flux ; le navigateur se reconnectera avec son Last-Event-ID.
+    """
 
-    # Parser la DB URL pour psycopg v3
-    db_url = strip_psycopg_dialect(settings.database_url)
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        except* SendTimeoutError:
+            slow_consumers.inc("send_timeout")
+            print("🐢 Client SSE bloqué : connexion fermée")
 
-    # Connexion PostgreSQL asynchrone pour LISTEN
-    aconn = await psycopg.AsyncConnection.connect(conninfo=db_url, autocommit=True)
-    channel_chat = "chat"
-    channel_typing_event = "typing_event"
 
+async def message_stream(room_id: str, last_event_id: str | None = None) -> AsyncGenerator:
+    """Stream des messages d'un salon via SSE, alimenté par le hub de notifications partagé"""
+    clients.inc("sse")
     try:
-        # S'abonner au canal de notification
-        async with aconn.cursor() as cursor:
-            await cursor.execute(f"LISTEN {channel_chat};")
-            await cursor.execute(f"LISTEN {channel_typing_event};")
-
-        print(f"✅ Abonné aux canaux '{channel_chat}' et '{channel_typing_event}'")
-
-        # Si last_event_id est fourni, envoyer les messages manqués
-        if last_event_id:
-            try:
-                from config.database import SessionLocal
-                from models.message import Message
-
-                db = SessionLocal()
-                missed_messages = db.query(Message).filter(Message.id > int(last_event_id)).all()
-
-                for msg in missed_messages:
-                    yield {
-                        "id": str(msg.id),
-                        "event": "message",
-                        "data": json.dumps(msg.to_dict()),
-                    }
-                db.close()
-            except (ValueError, Exception) as e:
-                print(f"⚠️ Erreur lors de la récupération des messages manqués: {e}")
-
-        # Boucle d'écoute des notifications avec psycopg v3
-        gen = aconn.notifies()
-        async for notify in gen:
-            try:
-                # Le payload contient l'ID du message
-                if notify.channel == channel_chat:
-                    message_id = int(notify.payload)
-
-                    print(f"📨 Notification reçue pour le message ID: {message_id}")
-
-                    # Récupérer le message depuis la DB
-                    from config.database import SessionLocal
-
-                    db = SessionLocal()
-                    message = MessageService.get_message_by_id(db, message_id)
-                    db.close()
-
-                    if message:
-                        yield {
-                            "id": str(message.id),
-                            "event": "message",
-                            "data": json.dumps(message.to_dict()),
-                        }
-                elif notify.channel == channel_typing_event:
-                    # Le payload contient les données de typing en JSON
-                    typing_data = json.loads(notify.payload)
-
-                    print(f"✍️ Notification typing reçue: {typing_data}")
-
-                    yield {"event": "typing", "data": json.dumps(typing_data)}
-            except Exception as e:
-                print(f"❌ Erreur lors du traitement de la notification: {e}")
-                continue
-
+        async for event in room_events(room_id, last_event_id):
+            delivery_lag.observe(time.monotonic() - event.created_at, "sse")
+            # Trame encodée une seule fois par le hub, transmise telle quelle
+            yield event.sse
+    except SubscriberLagging as e:
+        # Dernière trame : point de reprise et délai de reconnexion, puis fin du flux ;
+        # le navigateur se reconnecte et rattrape les messages depuis cet ID
+        yield ServerSentEvent(
+            id=str(e.last_id) if e.last_id is not None else None,
+            retry=settings.sse_retry_ms,
+            comment="lagging",
+        )
     except asyncio.CancelledError:
         print("🔌 Connexion SSE fermée par le client")
         raise
-    except Exception as e:
-        print(f"❌ Erreur dans le stream SSE: {e}")
-        raise
     finally:
-        await aconn.close()
-        print("🔒 Connexion PostgreSQL fermée")
+        clients.dec("sse")
 
 
 @router.get("/api/stream")
-async def stream_messages(request: Request):
-    """Endpoint SSE pour les messages en temps réel"""
-    # Récupérer le dernier ID d'événement si présent
-    last_event_id = request.headers.get("Last-Event-ID")
-
-    print(f"🌐 Nouvelle connexion SSE (Last-Event-ID: {last_event_id})")
-
-    return EventSourceResponse(
-        message_stream(last_event_id),
+async def stream_messages(
+    request: Request,
+    room: str = Query(default=DEFAULT_ROOM, pattern=ROOM_ID_PATTERN),  # noqa: B008
+    last_id: str | None = None,
+):
+    """Endpoint SSE pour les messages en temps réel d'un salon"""
+    # Récupérer le dernier ID d'événement si présent (en-tête de reconnexion du navigateur,
+    # ou paramètre lors d'une nouvelle connexion ouverte par le client)
+    last_event_id = request.headers.get("Last-Event-ID") or last_id
+
+    print(f"🌐 Nouvelle connexion SSE (salon: {room}, Last-Event-ID: {last_event_id})")
+
+    return ChatEventSourceResponse(
+        message_stream(room, last_event_id),
         headers={
             "Cache-Control": "no-cache",
             "X-Accel-Buffering": "no",
         },
+        # Commentaires périodiques : évitent la fermeture des connexions inactives par les proxies
+        ping=settings.sse_ping_interval,
+        send_timeout=settings.stream_send_timeout,
     )
@@ -0,0 +1,156 @@
+import asyncio
+import contextlib
+import time
+from functools import lru_cache
+
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect, status
+from pydantic import ValidationError
+
+from config.constants import DEFAULT_ROOM, ROOM_ID_PATTERN
+from config.settings import get_settings
+from schemas.message import MessageCreate
+from services import json_codec
+from services.chat_service import ChatService
+from services.event_stream import room_events
+from services.metrics import clients, delivery_lag, slow_consumers
+from services.notification_hub import Event, SubscriberLagging
+from services.typing_service import typing_service
+
+settings = get_settings()
+
+router = APIRouter()
+
+# Trames compactes {"t": type, "d": données}
+# Serveur → client : événements du hub (les données sont insérées telles quelles)
+EVENT_FRAME_TYPES = {
+    "message": "m",
+    "bot_delta": "d",
+    "bot_done": "f",
+    "typing": "y",
+}
+# Client → serveur : "m" (envoi d'un message, d = texte) et "y" (typing, d = booléen),
+# avec une référence "r" facultative renvoyée dans l'accusé "a" ou l'erreur "e"
+FRAME_SEND = "m"
+FRAME_TYPING = "y"
+FRAME_ACK = "a"
+FRAME_ERROR = "e"
+
+
+def encode_frame(frame_type: str, data) -> str:
+    return json_codec.dumps({"t": frame_type, "d": data})
+
+
+@lru_cache(maxsize=256)
+def encode_event(event: Event) -> str | None:
+    """Trame d'un événement du hub, construite une fois et partagée par toutes les sockets
+
+    Les données, déjà en JSON, sont insérées sans être re-sérialisées.
+    """
+    frame_type = EVENT_FRAME_TYPES.get(event.event)
+    if frame_type is None:
+        return None
+    return f'{{"t":"{frame_type}","d":{event.data}}}'
+
+
+async def send_events(websocket: WebSocket, room_id: str, last_event_id: str | None) -> None:
+    """Pousse les événements du salon (rattrapage puis direct) sur la socket
+
+    Un client en retard est déconnecté (code 1013) avec son point de reprise ; le client
+    se reconnecte avec `last_id` et rattrape les messages manqués.
+    """
+    try:
+        async for event in room_events(room_id, last_event_id):
+            frame = encode_event(event)
+            if frame is not None:
+                # Un envoi bloqué (client qui ne lit plus) lève TimeoutError
+                async with asyncio.timeout(settings.stream_send_timeout):
+                    await websocket.send_text(frame)
+                delivery_lag.observe(time.monotonic() - event.created_at, "ws")
+    except SubscriberLagging as e:
+        await websocket.close(
+            code=status.WS_1013_TRY_AGAIN_LATER, reason=f"lagging last_id={e.last_id}"
+        )
+
+
+async def receive_frames(websocket: WebSocket, room_id: str, username: str, avatar: str) -> None:
+    """Traite les envois et événements typing du client, sans requête HTTP par action"""
+    is_typing = False
+    try:
+        while True:
+            try:
+                frame = json_codec.loads(await websocket.receive_text())
+                frame_type, data, ref = frame["t"], frame.get("d"), frame.get("r")
+            except (ValueError, KeyError, TypeError):
+                await websocket.send_text(encode_frame(FRAME_ERROR, "Trame invalide"))
+                continue
+
+            if frame_type == FRAME_TYPING:
+                is_typing = bool(data)
+                await typing_service.update(room_id, username, avatar, is_typing)
+            elif frame_type == FRAME_SEND:
+                try:
+                    message_data = MessageCreate(
+                        room_id=room_id, username=username, avatar=avatar, message=data
+                    )
+                    message = await ChatService.post_message(message_data)
+                except ValidationError:
+                    reply = encode_frame(FRAME_ERROR, {"r": ref, "error": "Message invalide"})
+                except Exception as e:
+                    print(f"❌ Erreur lors de l'envoi d'un message WebSocket: {e}")
+                    reply = encode_frame(FRAME_ERROR, {"r": ref, "error": "Envoi impossible"})
+                else:
+                    reply = encode_frame(FRAME_ACK, {"r": ref, "id": message.id})
+                await websocket.send_text(reply)
+    finally:
+        # Une déconnexion en cours de frappe ne doit pas laisser l'indicateur affiché
+        if is_typing:
+            with contextlib.suppress(Exception):
+                await typing_service.update(room_id, username, avatar, False)
+
+
+@router.websocket("/ws")
+async def chat_socket(
+    websocket: WebSocket,
+    room: str = Query(default=DEFAULT_ROOM, pattern=ROOM_ID_PATTERN),  # noqa: B008
+    last_id: str | None = None,
+):
+    """Transport WebSocket : envois, typing et réception sur une seule connexion"""
+    username = websocket.cookies.get("username")
+    avatar = websocket.cookies.get("avatar")
+    if not username or not avatar:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    print(f"🌐 Nouvelle connexion WebSocket (salon: {room}, dernier ID: {last_id})")
+
+    clients.inc("ws")
+    tasks = [
+        asyncio.create_task(send_events(websocket, room, last_id)),
+        asyncio.create_task(receive_frames(websocket, room, username, avatar)),
+    ]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()  # type: ignore
+    except WebSocketDisconnect:
+        print("🔌 Connexion WebSocket fermée par le client")
+    except TimeoutError:
+        slow_consumers.inc("send_timeout")
+        print("🐢 Client WebSocket bloqué : connexion fermée")
+    except Exception as e:
+        print(f"❌ Erreur WebSocket: {e}")
+    finally:
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with contextlib.suppress(asyncio.CancelledError, Exception):
+                await task
+        clients.dec("ws")
+
+    # Fermer la connexion si elle est encore ouverte (arrêt du hub, erreur), sans attendre
+    # indéfiniment un client bloqué
+    with contextlib.suppress(Exception):
+        async with asyncio.timeout(settings.stream_send_timeout):
+            await websocket.close()
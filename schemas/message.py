@@ -1,9 +1,12 @@
 from datetime import datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from config.constants import DEFAULT_ROOM, ROOM_ID_PATTERN
 
 
 class MessageCreate(BaseModel):
+    room_id: str = Field(default=DEFAULT_ROOM, pattern=ROOM_ID_PATTERN)
     username: str
     avatar: str
     message: str
@@ -11,6 +14,7 @@ class MessageCreate(BaseModel):
 
 class MessageResponse(BaseModel):
     id: int
+    room_id: str
     username: str
     avatar: str
     message: str
@@ -22,6 +26,7 @@ class MessageResponse(BaseModel):
 
 
 class TypingEvent(BaseModel):
+    room_id: str = Field(default=DEFAULT_ROOM, pattern=ROOM_ID_PATTERN)
     username: str
     avatar: str
     is_typing: bool
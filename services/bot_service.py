@@ -1,39 +1,60 @@
-from google import genai
-from google.genai import types
-from sqlalchemy.orm import Session
+import asyncio
+import time
+import uuid
+from collections.abc import AsyncIterator
 
 from config.settings import get_settings
-from models.message import Message
 from schemas.message import MessageCreate
-from services.message_service import MessageService
+from services import json_codec
+from services.conversation_context import ContextStore, ContextTurn, context_store
+from services.llm import LLMProvider, create_llm_provider
+from services.message_writer import message_writer
+from services.metrics import llm_duration, llm_errors, llm_first_token
+from services.notification_hub import CHANNEL_BOT_DELTA, CHANNEL_BOT_DONE, notification_hub
+from services.response_cache import ResponseCache
+
+settings = get_settings()
 
 
 class BotService:
     BOT_AVATAR = "https://ollaix-ui.pages.dev/chatbot.png"
     BOT_USERNAME = "ChatBot"
 
+    def __init__(
+        self,
+        timeout: float = 30.0,
+        max_retries: int = 2,
+        retry_delay: float = 1.0,
+        cache: ResponseCache | None = None,
+        contexts: ContextStore | None = None,
+        llm: LLMProvider | None = None,
+    ):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.cache = cache or ResponseCache()
+        self.contexts = contexts or ContextStore()
+        self.llm = llm or create_llm_provider()
+
+    async def close(self) -> None:
+        await self.llm.aclose()
+
     def should_respond(self, message: str) -> bool:
         return "@bot" in message.lower()
 
-    def generate_response(
-        self, message: str, username: str, conversation_context: list[Message]
-    ) -> str:
-        client = genai.Client(api_key=get_settings().gemini_api_key)
+    def build_prompts(self, message: str, context_text: str) -> tuple[str, str]:
+        """Construit le prompt système et le prompt utilisateur
 
+        L'auteur de la question n'y figure pas : la réponse, mise en cache, peut être
+        servie à d'autres utilisateurs posant la même question.
+        """
         system_prompt = """Tu es un assistant qui réponde aux demandes des utilisateurs. Si on te demande qui tu es, tu réponds que tu es un assistant qui réponde aux demandes des utilisateurs. Et tu répond en français à chaque fois.
 
 Règles IMPORTANTES :
 - Réponds UNIQUEMENT avec ton message
 - Sois naturel et conversationnel
 """  # noqa: E501
-        if conversation_context:
-            context_text = "\n".join(
-                [
-                    f"{msg.username}: {msg.message}; is_bot: {msg.is_bot}"
-                    for msg in conversation_context
-                ]
-            )
-        else:
+        if not context_text:
             context_text = "Début de la discussion"
 
         user_prompt = f"""Contexte de la conversation :
@@ -42,30 +63,153 @@ Règles IMPORTANTES :
 Génère maintenant TON message de réponse courte.
 Réponds UNIQUEMENT avec le message, sans guillemets ni préambule.
 Voici le demande de l'utilisateur :
-Message Utilisateur: {message}; Nom Utilisateur: {username}"
+Message Utilisateur: {message}"
 """
 
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            config=types.GenerateContentConfig(system_instruction=system_prompt),
-            contents=user_prompt,
+        return system_prompt, user_prompt
+
+    async def summarize(self, previous_summary: str, turns: list[ContextTurn]) -> str:
+        """Met à jour le résumé de la conversation avec les tours sortis du contexte"""
+        transcript = "\n".join(turn.line for turn in turns)
+        prompt = f"""Résumé actuel de la conversation :
+{previous_summary or "(aucun)"}
+
+Nouveaux échanges à intégrer :
+{transcript}
+
+Rédige un résumé mis à jour, factuel et concis (5 phrases maximum), en français.
+Réponds UNIQUEMENT avec le résumé."""
+
+        started = time.perf_counter()
+        try:
+            summary = await asyncio.wait_for(self.llm.generate(prompt), timeout=self.timeout)
+        except Exception:
+            llm_errors.inc("summarize")
+            raise
+        llm_duration.observe(time.perf_counter() - started, "summarize")
+        return (summary or previous_summary).strip()
+
+    async def stream_response(self, message: str, context_text: str) -> AsyncIterator[str]:
+        """Génère la réponse en streaming, fragment par fragment"""
+        system_prompt, user_prompt = self.build_prompts(message, context_text)
+
+        started = time.perf_counter()
+        first_token = True
+        async for delta in self.llm.stream(user_prompt, system=system_prompt):
+            if first_token:
+                llm_first_token.observe(time.perf_counter() - started)
+                first_token = False
+            yield delta
+        llm_duration.observe(time.perf_counter() - started, "stream")
+
+    async def stream_response_with_retries(
+        self, message: str, context_text: str
+    ) -> AsyncIterator[str]:
+        """Stream avec délai maximal par tentative ; on ne réessaie que si rien n'a été émis"""
+        attempt = 0
+        while True:
+            emitted = False
+            try:
+                async with asyncio.timeout(self.timeout):
+                    async for delta in self.stream_response(message, context_text):
+                        emitted = True
+                        yield delta
+                return
+            except Exception as e:
+                llm_errors.inc("stream")
+                if emitted or attempt >= self.max_retries:
+                    raise
+                delay = self.retry_delay * 2**attempt
+                attempt += 1
+                print(f"⚠️ Échec de l'appel LLM ({e!r}), nouvelle tentative dans {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def process_bot_response(self, message: str, room_id: str) -> None:
+        """Traite la réponse du bot dans un salon (exécuté par le pool de workers)
+
+        Le contexte provient du contexte glissant en mémoire du salon (aucune requête
+        d'historique une fois amorcé). Une réponse en cache est réutilisée telle
+        quelle ; si la même question est déjà en cours de génération, on attend ce
+        résultat.
+        """
+        context = await self.contexts.load(room_id)
+        await self.contexts.refresh_summary(room_id, context)
+        turns = list(context.turns)
+        context_text = context.render()
+
+        stream_id: str | None = None
+        key = self.cache.make_key(message, room_id, turns)
+        bot_response = self.cache.get(key)
+
+        if bot_response is None:
+            inflight = self.cache.get_inflight(key)
+            if inflight is not None:
+                bot_response = await asyncio.shield(inflight)
+            else:
+                self.cache.begin(key)
+                stream_id = uuid.uuid4().hex
+                try:
+                    bot_response = await self._stream_to_subscribers(
+                        stream_id, room_id, message, context_text
+                    )
+                except BaseException as e:
+                    self.cache.fail(key, e)
+                    raise
+                self.cache.resolve(key, bot_response)
+
+        bot_message_data = MessageCreate(
+            room_id=room_id,
+            username=self.BOT_USERNAME,
+            avatar=self.BOT_AVATAR,
+            message=bot_response,
         )
 
-        return response.text  # type: ignore
+        bot_message = await message_writer.create_message(bot_message_data, is_bot=True)
+
+        if stream_id is not None:
+            await self._publish_done(stream_id, room_id, bot_message.id)
 
-    def process_bot_response(
-        self, db: Session, message: str, username: str, message_service: MessageService
-    ) -> None:
-        """Traite la réponse du bot en arrière-plan"""
+    async def _stream_to_subscribers(
+        self, stream_id: str, room_id: str, message: str, context_text: str
+    ) -> str:
+        """Diffuse les fragments en direct (`bot_delta`) et retourne la réponse complète"""
+        chunks: list[str] = []
         try:
-            conversation_context = message_service.get_recent_messages(db)
-            bot_response = self.generate_response(message, username, conversation_context)
+            async for delta in self.stream_response_with_retries(message, context_text):
+                chunks.append(delta)
+                await notification_hub.publish(
+                    CHANNEL_BOT_DELTA,
+                    json_codec.dumps(
+                        {
+                            "stream_id": stream_id,
+                            "room_id": room_id,
+                            "delta": delta,
+                            "username": self.BOT_USERNAME,
+                            "avatar": self.BOT_AVATAR,
+                        }
+                    ),
+                )
+        except Exception:
+            # Retirer la bulle provisoire chez les clients
+            await self._publish_done(stream_id, room_id, None)
+            raise
+
+        return "".join(chunks)
+
+    async def _publish_done(self, stream_id: str, room_id: str, message_id: int | None) -> None:
+        payload = {"stream_id": stream_id, "room_id": room_id, "message_id": message_id}
+        await notification_hub.publish(CHANNEL_BOT_DONE, json_codec.dumps(payload))
 
-            bot_message_data = MessageCreate(
-                username=self.BOT_USERNAME, avatar=self.BOT_AVATAR, message=bot_response
-            )
 
-            message_service.create_message(db, bot_message_data, is_bot=True)
-        except Exception as e:
-            # Log l'erreur (ajoutez votre logger ici)
-            print(f"Erreur lors de la génération de réponse bot: {e}")
+bot_service = BotService(
+    timeout=settings.bot_timeout,
+    max_retries=settings.bot_max_retries,
+    retry_delay=settings.bot_retry_delay,
+    cache=ResponseCache(
+        maxsize=settings.bot_cache_size,
+        ttl=settings.bot_cache_ttl,
+        context_size=settings.bot_cache_context_size,
+    ),
+    contexts=context_store,
+)
+context_store.summarizer = bot_service.summarize
@@ -0,0 +1,96 @@
+import asyncio
+import contextlib
+import time
+from dataclasses import dataclass, field
+
+from config.settings import get_settings
+from services.bot_service import BotService, bot_service
+from services.metrics import bot_queue_wait
+
+settings = get_settings()
+
+
+@dataclass(frozen=True, slots=True)
+class BotJob:
+    message: str
+    username: str
+    room_id: str
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class BotWorkerPool:
+    """File bornée de réponses bot, traitée par un nombre fixe de workers asynchrones"""
+
+    def __init__(self, bot: BotService, concurrency: int = 4, queue_size: int = 100):
+        self.bot = bot
+        self.concurrency = concurrency
+        self.queue: asyncio.Queue[BotJob] = asyncio.Queue(maxsize=queue_size)
+        self.active_jobs = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._workers: list[asyncio.Task] = []
+
+    @property
+    def queue_depth(self) -> int:
+        return self.queue.qsize()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "workers": self.concurrency,
+            "queue_depth": self.queue_depth,
+            "queue_capacity": self.queue.maxsize,
+            "active_jobs": self.active_jobs,
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+    async def start(self) -> None:
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._work(), name=f"bot-worker-{i}")
+                for i in range(self.concurrency)
+            ]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        for worker in self._workers:
+            with contextlib.suppress(asyncio.CancelledError):
+                await worker
+        self._workers = []
+
+        if self.queue_depth:
+            print(f"⚠️ {self.queue_depth} réponse(s) bot abandonnée(s) à l'arrêt")
+        await self.bot.close()
+
+    def submit(self, message: str, username: str, room_id: str) -> bool:
+        """Ajoute une demande à la file ; retourne False si la file est pleine"""
+        try:
+            self.queue.put_nowait(BotJob(message=message, username=username, room_id=room_id))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            print(f"⚠️ File du bot pleine ({self.queue.maxsize}), demande ignorée")
+            return False
+        return True
+
+    async def _work(self) -> None:
+        while True:
+            job = await self.queue.get()
+            bot_queue_wait.observe(time.monotonic() - job.enqueued_at)
+            self.active_jobs += 1
+            try:
+                await self.bot.process_bot_response(message=job.message, room_id=job.room_id)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"Erreur lors de la génération de réponse bot pour {job.username}: {e}")
+            finally:
+                self.active_jobs -= 1
+                self.queue.task_done()
+
+
+bot_worker_pool = BotWorkerPool(
+    bot_service, concurrency=settings.bot_concurrency, queue_size=settings.bot_queue_size
+)
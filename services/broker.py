@@ -0,0 +1,281 @@
+"""Brokers d'événements entre workers
+
+Chaque worker possède un seul abonnement au broker (via le hub de notifications) ;
+le broker délivre chaque message publié exactement une fois à chaque worker abonné.
+
+- ``memory``   : en mémoire, pour un seul processus et les tests
+- ``postgres`` : PostgreSQL LISTEN/NOTIFY
+- ``socket``   : processus broker local (``python -m services.broker``) joint en TCP
+"""
+
+import asyncio
+import contextlib
+from abc import ABC, abstractmethod
+from collections.abc import Awaitable, Callable
+
+import psycopg
+
+from config.settings import get_settings
+from services import json_codec
+
+settings = get_settings()
+
+# Pseudo-canal signalé au hub après une reconnexion (des messages ont pu être perdus)
+CHANNEL_RECONNECT = "_reconnect"
+
+MessageHandler = Callable[[str, str], Awaitable[None]]
+
+
+def strip_psycopg_dialect(url: str) -> str:
+    if "+psycopg" in url:
+        return url.replace("+psycopg", "")
+    return url
+
+
+class Broker(ABC):
+    """Interface publication/abonnement utilisée par le hub de notifications"""
+
+    # True si l'insertion d'un message publie elle-même sa notification (NOTIFY transactionnel)
+    notifies_on_insert = False
+
+    def __init__(self, channels: tuple[str, ...]):
+        self.channels = channels
+        self._handler: MessageHandler | None = None
+
+    @abstractmethod
+    async def start(self, handler: MessageHandler) -> None:
+        """Commence à recevoir les messages des canaux et les transmet à `handler`"""
+
+    @abstractmethod
+    async def stop(self) -> None: ...
+
+    @abstractmethod
+    async def publish(self, channel: str, payload: str) -> None: ...
+
+
+class InProcessBroker(Broker):
+    """Broker en mémoire : un seul processus (développement, tests)"""
+
+    async def start(self, handler: MessageHandler) -> None:
+        self._handler = handler
+
+    async def stop(self) -> None:
+        self._handler = None
+
+    async def publish(self, channel: str, payload: str) -> None:
+        if self._handler is not None and channel in self.channels:
+            await self._handler(channel, payload)
+
+
+class ReconnectingBroker(Broker):
+    """Base des brokers réseau : boucle de réception avec reconnexion automatique"""
+
+    def __init__(
+        self,
+        channels: tuple[str, ...],
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0,
+    ):
+        super().__init__(channels)
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self._task: asyncio.Task | None = None
+
+    async def start(self, handler: MessageHandler) -> None:
+        self._handler = handler
+        if self._task is None:
+            self._task = asyncio.create_task(self._receive_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    @abstractmethod
+    async def _receive(self, on_connected: Callable[[], Awaitable[None]]) -> None:
+        """Se connecte, appelle `on_connected` puis transmet les messages jusqu'à la coupure"""
+
+    async def _receive_forever(self) -> None:
+        delay = self.reconnect_delay
+        connected_once = False
+
+        async def on_connected() -> None:
+            nonlocal connected_once, delay
+            print(f"✅ {type(self).__name__} abonné aux canaux {', '.join(self.channels)}")
+            delay = self.reconnect_delay
+            # Les messages perdus pendant la coupure doivent être rattrapés
+            if connected_once and self._handler is not None:
+                await self._handler(CHANNEL_RECONNECT, "")
+            connected_once = True
+
+        while True:
+            try:
+                await self._receive(on_connected)
+            except asyncio.CancelledError:
+                print(f"🔒 {type(self).__name__} arrêté")
+                raise
+            except Exception as e:
+                print(f"❌ Connexion au broker perdue: {e} (nouvelle tentative dans {delay:.0f}s)")
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+
+class PostgresBroker(ReconnectingBroker):
+    """PostgreSQL LISTEN/NOTIFY : une connexion LISTEN et une connexion NOTIFY par worker"""
+
+    notifies_on_insert = True
+
+    def __init__(self, conninfo: str, channels: tuple[str, ...], **kwargs):
+        super().__init__(channels, **kwargs)
+        self.conninfo = conninfo
+        self._publish_conn: psycopg.AsyncConnection | None = None
+        self._publish_lock = asyncio.Lock()
+
+    async def stop(self) -> None:
+        await super().stop()
+        if self._publish_conn is not None:
+            await self._publish_conn.close()
+            self._publish_conn = None
+
+    async def publish(self, channel: str, payload: str) -> None:
+        async with self._publish_lock:
+            if self._publish_conn is None or self._publish_conn.closed:
+                self._publish_conn = await psycopg.AsyncConnection.connect(
+                    conninfo=self.conninfo, autocommit=True
+                )
+            try:
+                await self._publish_conn.execute("SELECT pg_notify(%s, %s)", (channel, payload))
+            except psycopg.OperationalError:
+                # Connexion perdue : elle sera rouverte au prochain envoi
+                await self._publish_conn.close()
+                self._publish_conn = None
+                raise
+
+    async def _receive(self, on_connected: Callable[[], Awaitable[None]]) -> None:
+        aconn = await psycopg.AsyncConnection.connect(conninfo=self.conninfo, autocommit=True)
+        try:
+            async with aconn.cursor() as cursor:
+                for channel in self.channels:
+                    await cursor.execute(f"LISTEN {channel};")
+            await on_connected()
+
+            async for notify in aconn.notifies():
+                await self._handler(notify.channel, notify.payload)  # type: ignore
+        finally:
+            await aconn.close()
+
+
+def encode_frame(channel: str, payload: str) -> bytes:
+    """Trame du broker socket : une ligne JSON par message"""
+    return json_codec.dumps({"c": channel, "p": payload}).encode() + b"\n"
+
+
+def decode_frame(line: bytes) -> tuple[str, str]:
+    frame = json_codec.loads(line)
+    return frame["c"], frame["p"]
+
+
+class SocketBroker(ReconnectingBroker):
+    """Client du processus broker local : chaque trame publiée est renvoyée à tous les workers"""
+
+    def __init__(self, host: str, port: int, channels: tuple[str, ...], **kwargs):
+        super().__init__(channels, **kwargs)
+        self.host = host
+        self.port = port
+        self._writer: asyncio.StreamWriter | None = None
+
+    async def publish(self, channel: str, payload: str) -> None:
+        if self._writer is None:
+            raise ConnectionError("Broker socket non connecté")
+        self._writer.write(encode_frame(channel, payload))
+        await self._writer.drain()
+
+    async def _receive(self, on_connected: Callable[[], Awaitable[None]]) -> None:
+        reader, writer = await asyncio.open_connection(
+            self.host, self.port, limit=BrokerServer.MAX_FRAME_SIZE
+        )
+        self._writer = writer
+        try:
+            await on_connected()
+            while line := await reader.readline():
+                channel, payload = decode_frame(line)
+                if channel in self.channels:
+                    await self._handler(channel, payload)  # type: ignore
+        finally:
+            self._writer = None
+            writer.close()
+            with contextlib.suppress(Exception):
+                await writer.wait_closed()
+
+
+class BrokerServer:
+    """Processus broker local : relaie chaque trame reçue à toutes les connexions"""
+
+    MAX_FRAME_SIZE = 1024 * 1024
+    # Un worker dont le tampon d'envoi dépasse ce seuil est déconnecté
+    MAX_BUFFER_SIZE = 16 * 1024 * 1024
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._clients: set[asyncio.StreamWriter] = set()
+
+    async def serve_forever(self) -> None:
+        server = await asyncio.start_server(
+            self._handle_client, self.host, self.port, limit=self.MAX_FRAME_SIZE
+        )
+        print(f"📡 Broker en écoute sur {self.host}:{self.port}")
+        async with server:
+            await server.serve_forever()
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._clients.add(writer)
+        print(f"🔗 Worker connecté ({len(self._clients)} au total)")
+        try:
+            while line := await reader.readline():
+                self._broadcast(line)
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+            print(f"🔌 Worker déconnecté ({len(self._clients)} restant(s))")
+
+    def _broadcast(self, line: bytes) -> None:
+        for client in list(self._clients):
+            if client.transport.get_write_buffer_size() > self.MAX_BUFFER_SIZE:
+                print("⚠️ Worker trop lent, déconnexion")
+                self._clients.discard(client)
+                client.close()
+                continue
+            client.write(line)
+
+
+def broker_name() -> str:
+    """Broker configuré ; à défaut, PostgreSQL si la base le permet, sinon en mémoire"""
+    if settings.broker:
+        return settings.broker
+    return "postgres" if settings.database_url.startswith("postgresql") else "memory"
+
+
+def create_broker(channels: tuple[str, ...]) -> Broker:
+    """Instancie le broker configuré (`BROKER` = memory | postgres | socket)"""
+    reconnect = {
+        "reconnect_delay": settings.notify_reconnect_delay,
+        "max_reconnect_delay": settings.notify_reconnect_max_delay,
+    }
+    name = broker_name()
+    if name == "memory":
+        return InProcessBroker(channels)
+    if name == "postgres":
+        return PostgresBroker(strip_psycopg_dialect(settings.database_url), channels, **reconnect)
+    if name == "socket":
+        return SocketBroker(settings.broker_host, settings.broker_port, channels, **reconnect)
+    raise ValueError(f"Broker inconnu: {name!r}")
+
+
+if __name__ == "__main__":
+    asyncio.run(BrokerServer(settings.broker_host, settings.broker_port).serve_forever())
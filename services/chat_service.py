@@ -0,0 +1,27 @@
+from models.message import Message
+from schemas.message import MessageCreate
+from services.bot_service import bot_service
+from services.bot_worker import bot_worker_pool
+from services.message_writer import message_writer
+
+
+class ChatService:
+    @staticmethod
+    async def post_message(message_data: MessageCreate) -> Message:
+        """Enregistre un message utilisateur et confie l'éventuelle réponse du bot à sa file
+
+        Partagé par les transports HTTP et WebSocket.
+        """
+        # Écriture groupée avec les envois concurrents
+        user_message = await message_writer.create_message(message_data)
+
+        # Vérifier si le bot doit répondre
+        if bot_service.should_respond(message_data.message):
+            # Confier la génération de réponse à la file du bot (sessions DB dédiées)
+            bot_worker_pool.submit(
+                message=message_data.message,
+                username=message_data.username,
+                room_id=message_data.room_id,
+            )
+
+        return user_message
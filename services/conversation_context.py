@@ -0,0 +1,185 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from config.constants import DEFAULT_ROOM
+from config.settings import get_settings
+from services import json_codec
+from services.message_service import MessageService
+from services.notification_hub import Event, notification_hub
+from services.read_router import read_router
+
+settings = get_settings()
+
+# Nombre maximal de tours en attente de résumé (si le LLM est indisponible)
+MAX_PENDING_TURNS = 200
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimation grossière (~4 caractères par token), suffisante pour un budget"""
+    return max(1, len(text) // 4)
+
+
+@dataclass(frozen=True, slots=True)
+class ContextTurn:
+    id: int
+    username: str
+    message: str
+    is_bot: bool
+
+    @property
+    def line(self) -> str:
+        return f"{self.username}: {self.message}; is_bot: {self.is_bot}"
+
+
+Summarizer = Callable[[str, list[ContextTurn]], Awaitable[str]]
+
+
+class ConversationContext:
+    """Contexte glissant d'une conversation, borné par un budget de tokens
+
+    Les tours qui sortent de la fenêtre sont mis de côté pour être intégrés au
+    résumé lors du prochain rafraîchissement.
+    """
+
+    def __init__(self, token_budget: int = 1500):
+        self.token_budget = token_budget
+        self.turns: deque[ContextTurn] = deque()
+        self.tokens = 0
+        self.summary = ""
+        self.evicted: list[ContextTurn] = []
+        # Instant (monotone) à partir duquel le résumé peut être rafraîchi
+        self.next_summary_at = 0.0
+
+    def append(self, turn: ContextTurn) -> None:
+        # Les commits concurrents peuvent arriver dans le désordre : dédoublonner par ID
+        if any(existing.id == turn.id for existing in self.turns):
+            return
+        self.turns.append(turn)
+        self.tokens += estimate_tokens(turn.line)
+
+        while self.tokens > self.token_budget and len(self.turns) > 1:
+            oldest = self.turns.popleft()
+            self.tokens -= estimate_tokens(oldest.line)
+            self.evicted.append(oldest)
+        del self.evicted[:-MAX_PENDING_TURNS]
+
+    def render(self) -> str:
+        lines = [turn.line for turn in self.turns]
+        if self.summary:
+            lines.insert(0, f"Résumé des échanges précédents : {self.summary}")
+        return "\n".join(lines)
+
+
+class ContextStore:
+    """Contextes de conversation en mémoire des salons où le bot intervient (LRU)
+
+    Le contexte d'un salon est amorcé depuis la DB lors de sa première utilisation
+    par le bot (une seule requête même si plusieurs réponses l'attendent), puis suivi
+    au fil des notifications. Les autres salons ne sont pas suivis. Le résumé n'est
+    rafraîchi qu'à la construction d'un prompt, par le worker qui traite la demande.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 1500,
+        summary_interval: float = 30.0,
+        warmup_size: int = 50,
+        max_rooms: int = 256,
+    ):
+        self.token_budget = token_budget
+        self.summary_interval = summary_interval
+        self.warmup_size = warmup_size
+        self.max_rooms = max_rooms
+        self.summarizer: Summarizer | None = None
+        self._contexts: OrderedDict[str, ConversationContext] = OrderedDict()
+        self._loading: dict[str, asyncio.Task[ConversationContext]] = {}
+        # Tours reçus pendant l'amorçage d'un salon, ajoutés après l'historique
+        self._buffered: dict[str, list[ContextTurn]] = {}
+
+    def on_event(self, event: Event) -> None:
+        """Écouteur du hub : ajoute les nouveaux messages aux contextes suivis"""
+        if event.event != "message" or event.room is None:
+            return
+
+        buffered = self._buffered.get(event.room)
+        context = self._contexts.get(event.room)
+        if buffered is None and context is None:
+            return
+        data = json_codec.loads(event.data)
+        turn = ContextTurn(data["id"], data["username"], data["message"], data["is_bot"])
+        if buffered is not None:
+            buffered.append(turn)
+        elif context is not None:
+            context.append(turn)
+
+    async def load(self, conversation_id: str = DEFAULT_ROOM) -> ConversationContext:
+        """Retourne le contexte d'un salon, amorcé par une seule requête d'historique"""
+        context = self._contexts.get(conversation_id)
+        if context is not None:
+            self._contexts.move_to_end(conversation_id)
+            return context
+
+        loading = self._loading.get(conversation_id)
+        if loading is None:
+            loading = self._loading[conversation_id] = asyncio.create_task(
+                self._load(conversation_id)
+            )
+        # L'amorçage est partagé : l'annulation d'une réponse ne l'interrompt pas
+        return await asyncio.shield(loading)
+
+    async def _load(self, conversation_id: str) -> ConversationContext:
+        self._buffered[conversation_id] = []
+        try:
+            # Les messages notifiés avant l'amorçage doivent y figurer
+            async with read_router.session(read_router.latest_id) as db:
+                messages = await MessageService.get_recent_messages(
+                    db, conversation_id, limit=self.warmup_size
+                )
+            context = ConversationContext(self.token_budget)
+            for msg in messages:
+                context.append(ContextTurn(msg.id, msg.username, msg.message, bool(msg.is_bot)))
+            # Les tours reçus en direct sont ajoutés après l'historique, sans doublon
+            for turn in self._buffered[conversation_id]:
+                context.append(turn)
+
+            self._contexts[conversation_id] = context
+            if len(self._contexts) > self.max_rooms:
+                self._contexts.popitem(last=False)
+            return context
+        finally:
+            self._buffered.pop(conversation_id, None)
+            self._loading.pop(conversation_id, None)
+
+    async def start(self) -> None:
+        # Suivre les nouveaux messages au fil des notifications
+        notification_hub.add_listener(self.on_event)
+
+    async def refresh_summary(self, conversation_id: str, context: ConversationContext) -> None:
+        """Intègre au résumé les tours sortis de la fenêtre depuis le dernier passage
+
+        Appelé par le worker qui construit le prompt du bot, au plus une fois par
+        `summary_interval` et par salon : aucun appel LLM pour les salons inactifs.
+        """
+        if self.summarizer is None or not context.evicted:
+            return
+        if time.monotonic() < context.next_summary_at:
+            return
+
+        context.next_summary_at = time.monotonic() + self.summary_interval
+        evicted, context.evicted = context.evicted, []
+        try:
+            context.summary = await self.summarizer(context.summary, evicted)
+        except Exception as e:
+            # Conserver les tours pour la prochaine tentative
+            context.evicted = (evicted + context.evicted)[-MAX_PENDING_TURNS:]
+            print(f"⚠️ Échec du résumé de la conversation '{conversation_id}': {e}")
+
+
+context_store = ContextStore(
+    token_budget=settings.bot_context_token_budget,
+    summary_interval=settings.bot_context_summary_interval,
+    max_rooms=settings.bot_context_rooms,
+)
@@ -0,0 +1,124 @@
+from collections.abc import AsyncGenerator
+
+from config.settings import get_settings
+from models.message import Message
+from services import json_codec
+from services.message_service import MessageService
+from services.metrics import events_dropped
+from services.notification_hub import (
+    CHANNEL_RECONNECT,
+    Event,
+    SubscriberLagging,
+    notification_hub,
+)
+from services.read_router import read_router
+from services.replay_buffer import replay_buffer
+
+settings = get_settings()
+
+
+async def get_missed_messages(room_id: str, last_id: int) -> AsyncGenerator[Message]:
+    """Messages du salon postérieurs au dernier ID reçu par le client, lus par pages
+
+    Une session par page : la connexion n'est pas gardée pendant l'envoi au client. Au-delà
+    de `catch_up_max_messages`, seuls les plus récents sont renvoyés (les plus anciens
+    restent accessibles dans l'historique). Les messages notifiés avant l'abonnement
+    doivent y figurer : la réplique n'est lue que si elle les contient.
+    """
+    page_size = settings.catch_up_page_size
+    min_id = read_router.latest_id
+    async with read_router.session(min_id) as db:
+        start = await MessageService.get_catch_up_start(
+            db, last_id, room_id, limit=settings.catch_up_max_messages
+        )
+    if start != last_id:
+        print(f"⚠️ Rattrapage limité aux {settings.catch_up_max_messages} derniers messages")
+        last_id = start
+
+    while True:
+        async with read_router.session(min_id) as db:
+            page = await MessageService.get_messages_after(db, last_id, room_id, limit=page_size)
+        for message in page:
+            yield message
+        if len(page) < page_size:
+            return
+        last_id = page[-1].id
+
+
+def replay_event(message: Message) -> Event:
+    """Événement de rattrapage, réutilisant la sérialisation du hub si elle est en cache"""
+    data = notification_hub.message_cache.get(message.id)
+    if data is None:
+        data = json_codec.dumps(message.to_dict())
+    return Event("message", data, str(message.id), message.room_id)
+
+
+async def missed_events(room_id: str, last_id: int) -> AsyncGenerator[Event]:
+    """Rattrapage depuis le tampon en mémoire s'il couvre `last_id`, sinon depuis la DB"""
+    events = replay_buffer.events_after(room_id, last_id)
+    if events is not None:
+        for event in events:
+            yield event
+        return
+    async for message in get_missed_messages(room_id, last_id):
+        yield replay_event(message)
+
+
+async def room_events(room_id: str, last_event_id: str | None = None) -> AsyncGenerator[Event]:
+    """Événements d'un salon pour un client : rattrapage depuis `last_event_id`, puis direct
+
+    Commun aux transports SSE et WebSocket ; s'arrête quand le hub s'arrête. Lève
+    `SubscriberLagging`, avec le dernier ID remis, si le client ne suit pas le rythme.
+    """
+    # S'abonner avant le rattrapage pour ne manquer aucune notification
+    subscription = notification_hub.subscribe(room_id)
+    last_id: int | None = None
+    # IDs envoyés par rattrapage : les notifications en direct de ces messages sont ignorées
+    replayed_ids: set[int] = set()
+
+    try:
+        # Si last_event_id est fourni, envoyer les messages manqués
+        if last_event_id:
+            try:
+                last_id = int(last_event_id)
+                async for event in missed_events(room_id, last_id):
+                    last_id = int(event.id)  # type: ignore
+                    replayed_ids.add(last_id)
+                    yield event
+            except (ValueError, Exception) as e:
+                print(f"⚠️ Erreur lors de la récupération des messages manqués: {e}")
+
+        while True:
+            try:
+                event = await subscription.get()
+            except SubscriberLagging:
+                raise SubscriberLagging(last_id) from None
+            if event is None:
+                # Le hub s'est arrêté (arrêt de l'application)
+                break
+
+            try:
+                if event.event == CHANNEL_RECONNECT:
+                    # Rattraper les messages émis pendant la coupure du hub
+                    if last_id is not None:
+                        async for missed in missed_events(room_id, last_id):
+                            last_id = int(missed.id)  # type: ignore
+                            replayed_ids.add(last_id)
+                            yield missed
+                    continue
+
+                # L'événement a déjà été résolu et sérialisé une seule fois par le hub
+                if event.id is not None:
+                    event_id = int(event.id)
+                    if event_id in replayed_ids:
+                        # Déjà envoyé lors du rattrapage
+                        continue
+                    # Les commits concurrents peuvent notifier les IDs dans le désordre
+                    last_id = max(last_id or 0, event_id)
+            except Exception as e:
+                events_dropped.inc("stream_error")
+                print(f"❌ Erreur lors du traitement de la notification: {e}")
+                continue
+            yield event
+    finally:
+        notification_hub.unsubscribe(subscription)
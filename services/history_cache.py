@@ -0,0 +1,112 @@
+import asyncio
+import bisect
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from config.settings import get_settings
+from schemas.message import MessageResponse
+from services.message_service import MessageService
+from services.notification_hub import CHANNEL_RECONNECT, Event, NotificationHub, notification_hub
+from services.read_router import read_router
+
+settings = get_settings()
+
+
+@dataclass(slots=True)
+class RoomHistory:
+    messages: list[MessageResponse]
+    has_more: bool
+
+
+class HistoryCache:
+    """Historique récent des salons (page de chat) gardé en mémoire par worker
+
+    Un salon n'est lu en DB qu'au premier affichage sur ce worker (une seule requête
+    même si de nombreux clients arrivent en même temps) ; les messages créés ensuite,
+    par n'importe quel worker, sont ajoutés à partir des événements du hub.
+    """
+
+    def __init__(self, hub: NotificationHub, page_size: int = 30, max_rooms: int = 256):
+        self.hub = hub
+        self.page_size = page_size
+        self.max_rooms = max_rooms
+        self._rooms: OrderedDict[str, RoomHistory] = OrderedDict()
+        self._loading: dict[str, asyncio.Task[RoomHistory]] = {}
+        # Messages reçus pendant le chargement d'un salon, fusionnés ensuite
+        self._buffered: dict[str, list[MessageResponse]] = {}
+
+    async def start(self) -> None:
+        self.hub.add_listener(self.on_event)
+
+    async def get(self, room_id: str) -> tuple[list[MessageResponse], bool]:
+        """Messages récents du salon (ordre chronologique) et s'il en reste de plus anciens"""
+        history = self._rooms.get(room_id)
+        if history is not None:
+            self._rooms.move_to_end(room_id)
+        else:
+            loading = self._loading.get(room_id)
+            if loading is None:
+                loading = self._loading[room_id] = asyncio.create_task(self._load(room_id))
+            # Le chargement est partagé : l'abandon d'un client ne l'annule pas
+            history = await asyncio.shield(loading)
+        return list(history.messages), history.has_more
+
+    async def _load(self, room_id: str) -> RoomHistory:
+        self._buffered[room_id] = []
+        try:
+            # Les messages notifiés avant le chargement doivent y figurer
+            async with read_router.session(read_router.latest_id) as db:
+                messages, has_more = await MessageService.get_messages_page(
+                    db, room_id, limit=self.page_size
+                )
+            history = RoomHistory([MessageResponse.model_validate(m) for m in messages], has_more)
+            for message in self._buffered[room_id]:
+                self._append(history, message)
+
+            self._rooms[room_id] = history
+            if len(self._rooms) > self.max_rooms:
+                self._rooms.popitem(last=False)
+            return history
+        finally:
+            self._buffered.pop(room_id, None)
+            self._loading.pop(room_id, None)
+
+    def on_event(self, event: Event) -> None:
+        """Écouteur du hub : ajoute les nouveaux messages aux salons en cache"""
+        if event.event == CHANNEL_RECONNECT:
+            # Des messages ont pu être perdus pendant la coupure : relire la DB
+            self._rooms.clear()
+            return
+        if event.event != "message" or event.room is None:
+            return
+
+        buffered = self._buffered.get(event.room)
+        history = self._rooms.get(event.room)
+        if buffered is None and history is None:
+            return
+        message = MessageResponse.model_validate_json(event.data)
+        if buffered is not None:
+            buffered.append(message)
+        elif history is not None:
+            self._append(history, message)
+
+    def _append(self, history: RoomHistory, message: MessageResponse) -> None:
+        messages = history.messages
+        if messages and message.id <= messages[-1].id:
+            # Déjà présent, ou notifié dans le désordre par des commits concurrents
+            if any(m.id == message.id for m in messages):
+                return
+            bisect.insort(messages, message, key=lambda m: m.id)
+        else:
+            messages.append(message)
+
+        if len(messages) > self.page_size:
+            del messages[0]
+            history.has_more = True
+
+
+history_cache = HistoryCache(
+    notification_hub,
+    page_size=settings.history_page_size,
+    max_rooms=settings.history_cache_rooms,
+)
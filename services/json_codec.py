@@ -0,0 +1,24 @@
+"""Encodage JSON des messages et événements : orjson s'il est installé, sinon `json`
+
+Sortie compacte et UTF-8 dans les deux cas, pour que les payloads aient la même
+forme quel que soit l'encodeur disponible.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(obj) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def loads(data: str | bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,220 @@
+"""Fournisseurs LLM interchangeables (bot et simulateur d'agents)
+
+- ``gemini`` : API Google Gemini
+- ``stub``   : réponses locales, sans réseau ; rejoue des réponses enregistrées
+  (``LLM_STUB_RESPONSES``) ou en génère de synthétiques, avec une latence et un
+  débit de tokens tirés de distributions configurables. Déterministe pour une
+  même graine et un même prompt.
+
+``LLM_RECORD_PATH`` enregistre les échanges du fournisseur réel au format
+attendu par le stub (JSON Lines).
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+from google import genai
+from google.genai import types
+
+from config.settings import get_settings
+
+settings = get_settings()
+
+STUB_WORDS = (
+    "bien", "sûr", "je", "pense", "que", "la", "question", "mérite", "réflexion",
+    "mais", "il", "faut", "aussi", "considérer", "le", "contexte", "et", "les",
+    "contraintes", "du", "projet", "en", "pratique", "on", "peut", "commencer",
+    "par", "une", "solution", "simple", "puis", "mesurer", "résultats", "avant",
+    "d'aller", "plus", "loin", "c'est", "un", "bon", "point", "à", "discuter",
+)  # fmt: skip
+
+
+def prompt_key(prompt: str, system: str | None = None) -> str:
+    return hashlib.sha1(f"{system or ''}\0{prompt}".encode()).hexdigest()
+
+
+class LLMProvider(ABC):
+    """Interface commune : génération complète ou en streaming"""
+
+    @abstractmethod
+    async def generate(self, prompt: str, system: str | None = None) -> str: ...
+
+    @abstractmethod
+    def stream(self, prompt: str, system: str | None = None) -> AsyncIterator[str]: ...
+
+    async def aclose(self) -> None:
+        return None
+
+
+class GeminiProvider(LLMProvider):
+    def __init__(self, api_key: str, model: str = "gemini-2.5-flash"):
+        self.api_key = api_key
+        self.model = model
+        self._client: genai.Client | None = None
+
+    @property
+    def client(self) -> genai.Client:
+        """Client Gemini créé une seule fois et réutilisé par tous les appels"""
+        if self._client is None:
+            self._client = genai.Client(api_key=self.api_key)
+        return self._client
+
+    def _config(self, system: str | None) -> types.GenerateContentConfig | None:
+        return types.GenerateContentConfig(system_instruction=system) if system else None
+
+    async def generate(self, prompt: str, system: str | None = None) -> str:
+        response = await self.client.aio.models.generate_content(
+            model=self.model, config=self._config(system), contents=prompt
+        )
+        return response.text or ""
+
+    async def stream(self, prompt: str, system: str | None = None) -> AsyncIterator[str]:
+        stream = await self.client.aio.models.generate_content_stream(
+            model=self.model, config=self._config(system), contents=prompt
+        )
+        async for chunk in stream:
+            if chunk.text:
+                yield chunk.text
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aio.aclose()
+            self._client = None
+
+
+class StubProvider(LLMProvider):
+    """Fournisseur local : réponses rejouées ou synthétiques, latence simulée
+
+    La latence avant le premier token suit une loi log-normale (médiane, sigma),
+    le débit une loi normale (tokens/s). Tout est tiré d'un générateur initialisé
+    par la graine et le prompt : un même prompt donne la même réponse et le même
+    profil de latence.
+    """
+
+    def __init__(
+        self,
+        responses_path: str | Path | None = None,
+        latency: float = 0.5,
+        latency_sigma: float = 0.5,
+        tokens_per_second: float = 50.0,
+        tokens_per_second_stddev: float = 10.0,
+        response_tokens: int = 60,
+        chunk_tokens: int = 8,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.tokens_per_second_stddev = tokens_per_second_stddev
+        self.response_tokens = response_tokens
+        self.chunk_tokens = chunk_tokens
+        self.seed = seed
+        self.recordings: dict[str, str] = {}
+        if responses_path:
+            self.recordings = self.load_recordings(responses_path)
+
+    @staticmethod
+    def load_recordings(path: str | Path) -> dict[str, str]:
+        recordings = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    key = prompt_key(record["prompt"], record.get("system"))
+                    recordings[key] = record["response"]
+        return recordings
+
+    def _rng(self, key: str) -> random.Random:
+        return random.Random(f"{self.seed}:{key}")
+
+    def _response(self, key: str, rng: random.Random) -> str:
+        if key in self.recordings:
+            return self.recordings[key]
+        if self.recordings:
+            # Prompt inconnu : une réponse enregistrée choisie de façon déterministe
+            responses = list(self.recordings.values())
+            return responses[int(key, 16) % len(responses)]
+        length = max(1, int(rng.gauss(self.response_tokens, self.response_tokens / 4)))
+        text = " ".join(rng.choices(STUB_WORDS, k=length))
+        return text[0].upper() + text[1:] + "."
+
+    def _tokens(self, text: str) -> list[str]:
+        words = text.split(" ")
+        return [word + " " for word in words[:-1]] + words[-1:]
+
+    async def _plan(self, prompt: str, system: str | None) -> tuple[list[str], float]:
+        """Attend la latence du premier token ; retourne les tokens et le débit"""
+        key = prompt_key(prompt, system)
+        rng = self._rng(key)
+        tokens = self._tokens(self._response(key, rng))
+        rate = max(1.0, rng.gauss(self.tokens_per_second, self.tokens_per_second_stddev))
+        await asyncio.sleep(rng.lognormvariate(0, self.latency_sigma) * self.latency)
+        return tokens, rate
+
+    async def generate(self, prompt: str, system: str | None = None) -> str:
+        tokens, rate = await self._plan(prompt, system)
+        await asyncio.sleep(len(tokens) / rate)
+        return "".join(tokens)
+
+    async def stream(self, prompt: str, system: str | None = None) -> AsyncIterator[str]:
+        tokens, rate = await self._plan(prompt, system)
+        for i in range(0, len(tokens), self.chunk_tokens):
+            chunk = tokens[i : i + self.chunk_tokens]
+            await asyncio.sleep(len(chunk) / rate)
+            yield "".join(chunk)
+
+
+class RecordingProvider(LLMProvider):
+    """Enregistre les réponses d'un fournisseur (JSON Lines), rejouables par le stub"""
+
+    def __init__(self, provider: LLMProvider, path: str | Path):
+        self.provider = provider
+        self.path = Path(path)
+
+    def _record(self, prompt: str, system: str | None, response: str) -> None:
+        record = {"system": system, "prompt": prompt, "response": response}
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    async def generate(self, prompt: str, system: str | None = None) -> str:
+        response = await self.provider.generate(prompt, system)
+        self._record(prompt, system, response)
+        return response
+
+    async def stream(self, prompt: str, system: str | None = None) -> AsyncIterator[str]:
+        chunks = []
+        async for chunk in self.provider.stream(prompt, system):
+            chunks.append(chunk)
+            yield chunk
+        self._record(prompt, system, "".join(chunks))
+
+    async def aclose(self) -> None:
+        await self.provider.aclose()
+
+
+def create_llm_provider() -> LLMProvider:
+    """Instancie le fournisseur configuré (`LLM_PROVIDER` = gemini | stub)"""
+    provider: LLMProvider
+    if settings.llm_provider == "gemini":
+        provider = GeminiProvider(settings.gemini_api_key, model=settings.llm_model)
+    elif settings.llm_provider == "stub":
+        provider = StubProvider(
+            responses_path=settings.llm_stub_responses,
+            latency=settings.llm_stub_latency,
+            latency_sigma=settings.llm_stub_latency_sigma,
+            tokens_per_second=settings.llm_stub_tokens_per_second,
+            tokens_per_second_stddev=settings.llm_stub_tokens_per_second_stddev,
+            response_tokens=settings.llm_stub_response_tokens,
+            seed=settings.llm_stub_seed,
+        )
+    else:
+        raise ValueError(f"Fournisseur LLM inconnu: {settings.llm_provider!r}")
+
+    if settings.llm_record_path:
+        provider = RecordingProvider(provider, settings.llm_record_path)
+    return provider
@@ -0,0 +1,24 @@
+from collections import OrderedDict
+
+
+class MessageCache:
+    """Cache LRU borné des messages sérialisés (JSON), indexé par ID"""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._items: OrderedDict[int, str] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, message_id: int) -> str | None:
+        data = self._items.get(message_id)
+        if data is not None:
+            self._items.move_to_end(message_id)
+        return data
+
+    def put(self, message_id: int, data: str) -> None:
+        self._items[message_id] = data
+        self._items.move_to_end(message_id)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
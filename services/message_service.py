@@ -1,44 +1,335 @@
-from sqlalchemy import text
-from sqlalchemy.orm import Session
+import re
+import time
+from collections import OrderedDict
 
-from models.message import Message
+from sqlalchemy import (
+    String,
+    Text,
+    case,
+    cast,
+    column,
+    func,
+    insert,
+    literal,
+    literal_column,
+    select,
+    table,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.constants import DEFAULT_ROOM
+from config.settings import get_settings
+from models.message import ArchivedMessage, Message
 from schemas.message import MessageCreate
+from services import json_codec
+from services.metrics import db_query_duration
+
+settings = get_settings()
+
+# PostgreSQL refuse les payloads NOTIFY de 8000 octets ou plus
+NOTIFY_PAYLOAD_LIMIT = 8000
+
+# Recherche plein texte (index créés par la migration 7d3f9b2a6c15) :
+# PostgreSQL : colonne générée tsvector indexée en GIN, configuration sans racinisation
+# (messages multilingues) ; SQLite : table FTS5 synchronisée par triggers
+SEARCH_CONFIG = "simple"
+search_vector = column("search_vector")
+messages_fts = table("messages_fts", column("rowid"))
+# La table FTS5 elle-même, opérande de MATCH et de bm25()
+messages_fts_all = literal_column("messages_fts")
+
+
+class ArchivedRooms:
+    """Mémorise les salons sans message archivé, pour leur épargner la lecture de l'archive
+
+    L'absence est constatée gratuitement quand la lecture de la page la plus récente de
+    l'archive revient vide, puis revérifiée après `recheck_interval` secondes : le job de
+    rétention tourne dans un autre processus.
+    """
+
+    def __init__(self, recheck_interval: float = 60.0, max_rooms: int = 4096):
+        self.recheck_interval = recheck_interval
+        self.max_rooms = max_rooms
+        self._empty: OrderedDict[str, float] = OrderedDict()
+
+    def may_have(self, room_id: str) -> bool:
+        expires = self._empty.get(room_id)
+        if expires is None:
+            return True
+        if expires <= time.monotonic():
+            del self._empty[room_id]
+            return True
+        return False
+
+    def mark_empty(self, room_id: str) -> None:
+        self._empty[room_id] = time.monotonic() + self.recheck_interval
+        self._empty.move_to_end(room_id)
+        while len(self._empty) > self.max_rooms:
+            self._empty.popitem(last=False)
+
+    def mark_archived(self, room_id: str) -> None:
+        self._empty.pop(room_id, None)
+
+
+archived_rooms = ArchivedRooms(recheck_interval=settings.archive_recheck_interval)
 
 
 class MessageService:
     @staticmethod
-    def create_message(db: Session, message_data: MessageCreate, is_bot: bool = False) -> Message:
-        """Crée un nouveau message et déclenche une notification PostgreSQL"""
-        db_message = Message(
-            username=message_data.username,
-            avatar=message_data.avatar,
-            message=message_data.message,
-            is_bot=is_bot,
-        )
-        db.add(db_message)
-        db.commit()
-        db.refresh(db_message)
-
-        # Déclencher la notification PostgreSQL avec l'ID du message
-        try:
-            # Utiliser text() avec un paramètre bindé pour éviter l'injection SQL
-            db.execute(
-                text("SELECT pg_notify('chat', :message_id)"),
-                {"message_id": str(db_message.id)}
+    def build_notify_payload(message: Message) -> str:
+        """Payload NOTIFY : le message sérialisé, ou son ID s'il dépasse la limite"""
+        payload = json_codec.dumps(message.to_dict())
+        if len(payload.encode()) < NOTIFY_PAYLOAD_LIMIT:
+            return payload
+        return str(message.id)
+
+    @staticmethod
+    def build_insert_statement(dialect_name: str, rows: list[dict], notify: bool = True):
+        """INSERT ... RETURNING ; sous PostgreSQL, le NOTIFY part dans la même requête
+
+        Le message est sérialisé en JSON par PostgreSQL (ou réduit à son ID s'il
+        dépasse la limite NOTIFY) : insertion et notification ne font qu'un aller-retour
+        et une seule transaction. Avec `notify=False`, la notification est laissée à
+        l'appelant (broker autre que PostgreSQL).
+        """
+        table = Message.__table__
+        inserted = insert(table).values(rows).returning(*table.c)
+        if dialect_name != "postgresql" or not notify:
+            return inserted
+
+        inserted_cte = inserted.cte("inserted")
+        serialized = select(
+            *inserted_cte.c,
+            cast(
+                func.json_build_object(
+                    *(
+                        arg
+                        for column in inserted_cte.c
+                        for arg in (literal(column.name, String), column)
+                    )
+                ),
+                Text,
+            ).label("payload"),
+        ).cte("serialized")
+        notify_payload = case(
+            (func.octet_length(serialized.c.payload) < NOTIFY_PAYLOAD_LIMIT, serialized.c.payload),
+            else_=cast(serialized.c.id, Text),
+        )
+        return (
+            select(
+                *(serialized.c[column.name] for column in table.c),
+                func.pg_notify("chat", notify_payload).label("notified"),
             )
-            db.commit()
-        except Exception as e:
-            print(f"Erreur lors de la notification PostgreSQL: {e}")
+            # pg_notify est volatile : évalué après le tri, donc dans l'ordre des IDs
+            .order_by(serialized.c.id)
+        )
+
+    @staticmethod
+    @db_query_duration.time("insert_messages")
+    async def insert_messages(
+        db: AsyncSession, messages: list[tuple[MessageCreate, bool]], notify: bool = True
+    ) -> list[Message]:
+        """Insère plusieurs messages (et leurs notifications) en une seule requête
 
+        Ne valide pas la transaction : c'est à l'appelant de faire le commit.
+        """
+        rows = [
+            {
+                "room_id": message_data.room_id,
+                "username": message_data.username,
+                "avatar": message_data.avatar,
+                "message": message_data.message,
+                "is_bot": is_bot,
+            }
+            for message_data, is_bot in messages
+        ]
+        statement = MessageService.build_insert_statement(db.bind.dialect.name, rows, notify)
+        result = await db.execute(statement)
+        columns = [column.name for column in Message.__table__.c]
+        inserted = sorted(
+            (Message(**{name: row._mapping[name] for name in columns}) for row in result),
+            key=lambda message: message.id,
+        )
+        return inserted
+
+    @staticmethod
+    @db_query_duration.time("create_message")
+    async def create_message(
+        db: AsyncSession, message_data: MessageCreate, is_bot: bool = False
+    ) -> Message:
+        """Crée un nouveau message et déclenche une notification PostgreSQL
+
+        Un seul aller-retour (INSERT ... RETURNING + pg_notify) et un seul commit.
+        """
+        [db_message] = await MessageService.insert_messages(db, [(message_data, is_bot)])
+        await db.commit()
         return db_message
 
     @staticmethod
-    def get_recent_messages(db: Session, limit: int = 50) -> list[Message]:
-        """Récupère les messages récents"""
-        messages = db.query(Message).order_by(Message.timestamp.desc()).limit(limit).all()
-        return list(reversed(messages))  # Inverser pour avoir l'ordre chronologique
+    async def get_recent_messages(
+        db: AsyncSession, room_id: str = DEFAULT_ROOM, limit: int = 50
+    ) -> list[Message]:
+        """Récupère les messages récents d'un salon"""
+        messages, _ = await MessageService.get_messages_page(db, room_id, limit=limit)
+        return messages
 
     @staticmethod
-    def get_message_by_id(db: Session, message_id: int) -> Message:
+    @db_query_duration.time("get_messages_page")
+    async def get_messages_page(
+        db: AsyncSession,
+        room_id: str = DEFAULT_ROOM,
+        before_id: int | None = None,
+        limit: int = 50,
+    ) -> tuple[list[Message], bool]:
+        """Récupère une page d'historique d'un salon antérieure à `before_id` (pagination keyset)
+
+        Les IDs suivent l'ordre d'insertion : l'index (room_id, id) sert à la fois
+        au filtre et au tri. Retourne les messages dans l'ordre chronologique et un
+        indicateur signalant s'il reste des messages plus anciens.
+
+        L'archive n'est lue que lorsque la table `messages` ne suffit plus à remplir la
+        page, et jamais pour un salon dont on sait l'archive vide : les pages récentes et
+        les petits salons ne coûtent qu'une requête sur la table chaude.
+        """
+        query = (
+            select(Message)
+            .where(Message.room_id == room_id)
+            .order_by(Message.id.desc())
+            .limit(limit + 1)
+        )
+        if before_id is not None:
+            query = query.where(Message.id < before_id)
+
+        result = await db.scalars(query)
+        messages = list(result.all())
+        if len(messages) <= limit and archived_rooms.may_have(room_id):
+            archived = await MessageService.get_archived_messages(
+                db, room_id, before_id=before_id, limit=limit + 1
+            )
+            if archived:
+                messages = sorted(messages + archived, key=lambda m: m.id, reverse=True)
+        has_more = len(messages) > limit
+        # Inverser pour avoir l'ordre chronologique
+        return list(reversed(messages[:limit])), has_more
+
+    @staticmethod
+    @db_query_duration.time("get_archived_messages")
+    async def get_archived_messages(
+        db: AsyncSession,
+        room_id: str = DEFAULT_ROOM,
+        before_id: int | None = None,
+        limit: int = 50,
+    ) -> list[Message]:
+        """Messages archivés d'un salon antérieurs à `before_id`, du plus récent au plus ancien
+
+        Retournés comme des `Message` non attachés à la session, pour être servis
+        comme les messages récents.
+        """
+        query = (
+            select(ArchivedMessage)
+            .where(ArchivedMessage.room_id == room_id)
+            .order_by(ArchivedMessage.id.desc())
+            .limit(limit)
+        )
+        if before_id is not None:
+            query = query.where(ArchivedMessage.id < before_id)
+
+        columns = [column.name for column in Message.__table__.c]
+        messages = [
+            Message(**{name: getattr(archived, name) for name in columns})
+            for archived in await db.scalars(query)
+        ]
+        if messages:
+            archived_rooms.mark_archived(room_id)
+        elif before_id is None:
+            # Même les messages archivés les plus récents manquent : l'archive du salon est vide
+            archived_rooms.mark_empty(room_id)
+        return messages
+
+    @staticmethod
+    def build_fts5_query(text: str) -> str:
+        """Requête FTS5 sans opérateurs : chaque mot entre guillemets, tous requis"""
+        return " ".join(f'"{word}"' for word in re.findall(r"\w+", text))
+
+    @staticmethod
+    @db_query_duration.time("search_messages")
+    async def search_messages(
+        db: AsyncSession,
+        text: str,
+        room_id: str = DEFAULT_ROOM,
+        offset: int = 0,
+        limit: int = 20,
+    ) -> tuple[list[Message], bool]:
+        """Recherche plein texte dans les messages d'un salon, par pertinence décroissante
+
+        Ne lit que l'index de recherche : jamais de parcours de la table. À pertinence
+        égale, les messages les plus récents d'abord. Les messages archivés ne sont pas
+        indexés. Retourne une page et un indicateur signalant s'il reste des résultats.
+        """
+        if db.bind.dialect.name == "postgresql":
+            tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, text)
+            rank = func.ts_rank_cd(search_vector, tsquery)
+            query = select(Message).where(search_vector.op("@@")(tsquery)).order_by(rank.desc())
+        else:
+            match = MessageService.build_fts5_query(text)
+            if not match:
+                return [], False
+            # bm25 : plus la valeur est basse, plus le message est pertinent
+            rank = func.bm25(messages_fts_all)
+            query = (
+                select(Message)
+                .join(messages_fts, messages_fts.c.rowid == Message.id)
+                .where(messages_fts_all.op("MATCH")(match))
+                .order_by(rank)
+            )
+
+        query = (
+            query.where(Message.room_id == room_id)
+            .order_by(Message.id.desc())
+            .offset(offset)
+            .limit(limit + 1)
+        )
+        messages = list(await db.scalars(query))
+        return messages[:limit], len(messages) > limit
+
+    @staticmethod
+    @db_query_duration.time("get_message_by_id")
+    async def get_message_by_id(db: AsyncSession, message_id: int) -> Message | None:
         """Récupère un message par son ID"""
-        return db.query(Message).filter(Message.id == message_id).first()
+        return await db.scalar(select(Message).where(Message.id == message_id))
+
+    @staticmethod
+    @db_query_duration.time("get_messages_after")
+    async def get_messages_after(
+        db: AsyncSession, last_id: int, room_id: str = DEFAULT_ROOM, limit: int | None = None
+    ) -> list[Message]:
+        """Récupère les messages d'un salon postérieurs au dernier ID reçu par un client
+
+        Avec `limit`, retourne une seule page : la suivante commence après le dernier ID.
+        """
+        result = await db.scalars(
+            select(Message)
+            .where(Message.room_id == room_id, Message.id > last_id)
+            .order_by(Message.id)
+            .limit(limit)
+        )
+        return list(result.all())
+
+    @staticmethod
+    @db_query_duration.time("get_catch_up_start")
+    async def get_catch_up_start(
+        db: AsyncSession, last_id: int, room_id: str = DEFAULT_ROOM, limit: int = 1000
+    ) -> int:
+        """ID à partir duquel rattraper un client pour ne lui renvoyer que `limit` messages
+
+        Retourne `last_id` si le client a manqué au plus `limit` messages, sinon l'ID qui
+        précède les `limit` plus récents.
+        """
+        start = await db.scalar(
+            select(Message.id)
+            .where(Message.room_id == room_id, Message.id > last_id)
+            .order_by(Message.id.desc())
+            .offset(limit)
+            .limit(1)
+        )
+        return last_id if start is None else start
@@ -0,0 +1,86 @@
+import asyncio
+
+from config.database import AsyncSessionLocal
+from config.settings import get_settings
+from models.message import Message
+from schemas.message import MessageCreate
+from services.message_service import MessageService
+from services.notification_hub import CHANNEL_CHAT, NotificationHub, notification_hub
+from services.read_router import read_router
+
+settings = get_settings()
+
+
+class MessageWriter:
+    """Écriture groupée (group commit) des messages
+
+    Les insertions concurrentes reçues pendant une courte fenêtre partagent une
+    seule requête INSERT ... RETURNING et un seul commit, au lieu d'un fsync par
+    message. Si le broker ne notifie pas lui-même à l'insertion, les messages
+    sont publiés après le commit.
+    """
+
+    def __init__(self, hub: NotificationHub, window: float = 0.005, max_batch: int = 100):
+        self.hub = hub
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: list[tuple[MessageCreate, bool, asyncio.Future[Message]]] = []
+        self._task: asyncio.Task | None = None
+
+    async def create_message(self, message_data: MessageCreate, is_bot: bool = False) -> Message:
+        future: asyncio.Future[Message] = asyncio.get_running_loop().create_future()
+        self._pending.append((message_data, is_bot, future))
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_pending())
+        return await future
+
+    async def _flush_pending(self) -> None:
+        try:
+            while self._pending:
+                # Laisser les insertions concurrentes rejoindre le lot
+                await asyncio.sleep(self.window)
+                batch = self._pending[: self.max_batch]
+                del self._pending[: self.max_batch]
+                await self._write_batch(batch)
+        finally:
+            self._task = None
+
+    async def _write_batch(
+        self, batch: list[tuple[MessageCreate, bool, asyncio.Future[Message]]]
+    ) -> None:
+        notifies_on_insert = self.hub.broker.notifies_on_insert
+        try:
+            async with AsyncSessionLocal() as db:
+                messages = await MessageService.insert_messages(
+                    db,
+                    [(message_data, is_bot) for message_data, is_bot, _ in batch],
+                    notify=notifies_on_insert,
+                )
+                await db.commit()
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        # Lecture de ses propres écritures : pas de lecture sur une réplique qui ne les a pas
+        read_router.observe(messages[-1].id)
+        for (_, _, future), message in zip(batch, messages, strict=True):
+            if not future.done():
+                future.set_result(message)
+
+        if not notifies_on_insert:
+            for message in messages:
+                try:
+                    await self.hub.publish(
+                        CHANNEL_CHAT, MessageService.build_notify_payload(message)
+                    )
+                except Exception as e:
+                    print(f"❌ Échec de la publication du message ID {message.id}: {e}")
+
+
+message_writer = MessageWriter(
+    notification_hub,
+    window=settings.message_write_window,
+    max_batch=settings.message_write_max_batch,
+)
@@ -0,0 +1,273 @@
+"""Métriques du worker au format texte Prometheus (exposées sur /metrics)
+
+Implémentation minimale et sans dépendance : un compteur ou un histogramme ne
+coûte qu'un accès dictionnaire (et une recherche dichotomique pour les
+histogrammes) sur le chemin critique. Les valeurs dérivées de l'état des services
+(abonnés, profondeur de file) sont lues au moment de la collecte, via des fonctions.
+
+Chaque worker a ses propres métriques : avec plusieurs workers, une collecte ne
+reflète que le worker qui l'a servie.
+"""
+
+import bisect
+import functools
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterator
+
+# Bornes par défaut (secondes), de la milliseconde à la dizaine de secondes
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(ABC):
+    """Métrique exposée : en-têtes HELP/TYPE puis échantillons"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+
+    def header(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.type}"
+
+    @abstractmethod
+    def samples(self) -> Iterator[str]:
+        """Lignes d'échantillons au format texte Prometheus"""
+
+    def collect(self) -> Iterator[str]:
+        yield from self.header()
+        yield from self.samples()
+
+
+class Counter(Metric):
+    """Valeur croissante, par combinaison d'étiquettes"""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        # Sans étiquettes, la série existe dès le départ (valeur 0)
+        self._values: dict[tuple[str, ...], float] = {} if labelnames else {(): 0}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{format_labels(self.labelnames, labels)} {format_value(value)}"
+
+
+class Gauge(Counter):
+    """Valeur instantanée : fixée, incrémentée ou décrémentée"""
+
+    type = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class CallbackMetric(Metric):
+    """Valeur lue au moment de la collecte (état d'un service), sans coût entre deux collectes
+
+    La fonction retourne un nombre, ou un dictionnaire {valeurs d'étiquettes: nombre}.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        func: Callable[[], float | dict[tuple[str, ...], float]],
+        metric_type: str = "gauge",
+        labelnames: tuple[str, ...] = (),
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.type = metric_type
+        self.func = func
+
+    def samples(self) -> Iterator[str]:
+        values = self.func()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labels, value in values.items():
+            yield f"{self.name}{format_labels(self.labelnames, labels)} {format_value(value)}"
+
+
+class Histogram(Metric):
+    """Distribution de valeurs par intervalles cumulés (`le`), avec somme et nombre"""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Par étiquettes : effectifs par intervalle (le dernier pour +Inf), somme
+        self._counts: dict[tuple[str, ...], list[int]] = {}
+        self._sums: dict[tuple[str, ...], float] = {}
+        if not labelnames:
+            self._counts[()] = [0] * (len(self.buckets) + 1)
+            self._sums[()] = 0.0
+
+    def observe(self, value: float, *labels: str) -> None:
+        counts = self._counts.get(labels)
+        if counts is None:
+            counts = self._counts[labels] = [0] * (len(self.buckets) + 1)
+            self._sums[labels] = 0.0
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._sums[labels] += value
+
+    def samples(self) -> Iterator[str]:
+        for labels, counts in self._counts.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts, strict=True):
+                cumulative += count
+                le = format_labels(self.labelnames, labels, f'le="{format_value(bound)}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            suffix = format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{suffix} {format_value(self._sums[labels])}"
+            yield f"{self.name}_count{suffix} {cumulative}"
+
+    def time(self, *labels: str):
+        """Décorateur : observe la durée d'une coroutine"""
+
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - started, *labels)
+
+            return wrapper
+
+        return decorator
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Métrique déjà enregistrée: {metric.name}")
+        self._metrics[metric.name] = metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self.register(metric)
+        return metric
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        metric = Gauge(name, documentation, labelnames)
+        self.register(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self.register(metric)
+        return metric
+
+    def callback(
+        self,
+        name: str,
+        documentation: str,
+        func: Callable[[], float | dict[tuple[str, ...], float]],
+        metric_type: str = "gauge",
+        labelnames: tuple[str, ...] = (),
+    ) -> CallbackMetric:
+        metric = CallbackMetric(name, documentation, func, metric_type, labelnames)
+        self.register(metric)
+        return metric
+
+    def render(self) -> str:
+        """Exposition au format texte Prometheus (version 0.0.4)"""
+        lines = []
+        for metric in self._metrics.values():
+            try:
+                lines.extend(metric.collect())
+            except Exception as e:
+                print(f"❌ Erreur lors de la collecte de la métrique {metric.name}: {e}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# Métriques du pipeline temps réel, partagées par les services et les routes
+clients = registry.gauge("chatx_clients", "Clients connectés au flux d'événements", ("transport",))
+delivery_lag = registry.histogram(
+    "chatx_delivery_lag_seconds",
+    "Délai entre la réception d'un événement par le hub et son envoi à un client",
+    ("transport",),
+)
+events_dropped = registry.counter(
+    "chatx_events_dropped_total", "Événements non remis aux clients", ("reason",)
+)
+slow_consumers = registry.counter(
+    "chatx_slow_consumers_total",
+    "Clients trop lents déconnectés (file d'événements pleine ou envoi bloqué)",
+    ("reason",),
+)
+broker_reconnects = registry.counter(
+    "chatx_broker_reconnects_total", "Reconnexions du hub au broker"
+)
+db_reads = registry.counter(
+    "chatx_db_reads_total",
+    "Sessions de lecture ouvertes, par base (replica ou primary)",
+    ("target",),
+)
+db_query_duration = registry.histogram(
+    "chatx_db_query_duration_seconds", "Durée des requêtes de MessageService", ("method",)
+)
+bot_queue_wait = registry.histogram(
+    "chatx_bot_queue_wait_seconds",
+    "Attente d'une demande dans la file du bot",
+    buckets=LLM_BUCKETS,
+)
+llm_duration = registry.histogram(
+    "chatx_llm_duration_seconds",
+    "Durée totale d'un appel LLM",
+    ("operation",),
+    buckets=LLM_BUCKETS,
+)
+llm_first_token = registry.histogram(
+    "chatx_llm_first_token_seconds",
+    "Délai avant le premier fragment d'une réponse LLM en streaming",
+    buckets=LLM_BUCKETS,
+)
+llm_errors = registry.counter("chatx_llm_errors_total", "Appels LLM en échec", ("operation",))
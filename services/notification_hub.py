@@ -0,0 +1,304 @@
+import asyncio
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Self
+
+from sse_starlette import ServerSentEvent
+
+from config.settings import get_settings
+from services import json_codec
+from services.broker import CHANNEL_RECONNECT, Broker, create_broker
+from services.message_cache import MessageCache
+from services.message_service import MessageService
+from services.metrics import broker_reconnects, events_dropped, slow_consumers
+from services.read_router import read_router
+
+settings = get_settings()
+
+CHANNEL_CHAT = "chat"
+CHANNEL_BOT_DELTA = "bot_delta"
+CHANNEL_BOT_DONE = "bot_done"
+# Canal interne : transmis aux écouteurs du hub, jamais aux abonnés SSE
+CHANNEL_TYPING = "typing_state"
+
+# Canaux dont le payload est diffusé tel quel, comme données de l'événement
+PASSTHROUGH_CHANNELS = (CHANNEL_BOT_DELTA, CHANNEL_BOT_DONE, CHANNEL_TYPING)
+BROKER_CHANNELS = (CHANNEL_CHAT, *PASSTHROUGH_CHANNELS)
+# Événements « instantané » : un nouvel événement remplace celui encore en attente
+COALESCED_EVENTS = ("typing",)
+
+
+@dataclass(frozen=True)
+class Event:
+    """Événement prêt à être envoyé, partagé tel quel par tous les abonnés
+
+    Les données sont sérialisées une fois par le hub, et la trame SSE encodée une
+    fois au premier envoi : tous les abonnés reçoivent les mêmes octets.
+    """
+
+    event: str
+    data: str
+    id: str | None = None
+    # Salon destinataire ; None pour un événement adressé à tous les salons
+    room: str | None = None
+    # Réception par le hub (horloge monotone), pour mesurer le délai de remise aux clients
+    created_at: float = field(default_factory=time.monotonic, compare=False)
+
+    @cached_property
+    def sse(self) -> bytes:
+        """Trame SSE (id, event, data) au format d'EventSourceResponse"""
+        return ServerSentEvent(self.data, event=self.event, id=self.id).encode()
+
+    def replayed(self) -> Self:
+        """Copie pour un rattrapage, horodatée maintenant, qui réutilise la trame SSE encodée"""
+        event = type(self)(self.event, self.data, self.id, self.room)
+        if "sse" in self.__dict__:
+            event.__dict__["sse"] = self.__dict__["sse"]
+        return event
+
+
+async def fetch_message_data(message_id: int) -> str | None:
+    """Charge et sérialise un message depuis la DB (la réplique si elle l'a déjà reçu)"""
+    async with read_router.session(message_id) as db:
+        message = await MessageService.get_message_by_id(db, message_id)
+        return json_codec.dumps(message.to_dict()) if message else None
+
+
+class SubscriberLagging(Exception):
+    """Le client n'a pas suivi le rythme : ses événements en attente ont été abandonnés
+
+    Il doit se reconnecter en reprenant depuis le dernier ID qu'il a reçu (`last_id`).
+    """
+
+    def __init__(self, last_id: int | None = None):
+        super().__init__(last_id)
+        self.last_id = last_id
+
+
+class Subscription:
+    """File d'événements bornée d'un client abonné à un salon
+
+    Les événements « typing » ne sont pas empilés : le dernier instantané remplace le
+    précédent. Si la file est pleine malgré cela, le client est déclaré en retard : la
+    file est vidée et `get` lève `SubscriberLagging`.
+    """
+
+    def __init__(self, room_id: str, maxsize: int):
+        self.room_id = room_id
+        self.maxsize = maxsize
+        self.lagging = False
+        self.closed = False
+        self._events: deque[Event] = deque()
+        # Dernier instantané par type d'événement fusionné
+        self._latest: dict[str, Event] = {}
+        self._waiter: asyncio.Future[None] | None = None
+
+    def __len__(self) -> int:
+        return len(self._events) + len(self._latest)
+
+    def put(self, event: Event) -> bool:
+        """Ajoute un événement ; False si la file déborde (le client est en retard)"""
+        if self.lagging or self.closed:
+            return True
+        if event.event in COALESCED_EVENTS:
+            if event.event in self._latest:
+                events_dropped.inc("coalesced")
+            self._latest[event.event] = event
+        elif len(self._events) >= self.maxsize:
+            return False
+        else:
+            self._events.append(event)
+        self._wakeup()
+        return True
+
+    def mark_lagging(self) -> int:
+        """Abandonne les événements en attente et réveille le client ; retourne leur nombre"""
+        dropped = len(self)
+        self.lagging = True
+        self._events.clear()
+        self._latest.clear()
+        self._wakeup()
+        return dropped
+
+    def close(self) -> None:
+        """Le hub s'arrête : `get` retourne None une fois les événements en attente remis"""
+        self.closed = True
+        self._wakeup()
+
+    async def get(self) -> Event | None:
+        while not (self._events or self._latest or self.lagging or self.closed):
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+
+        if self.lagging:
+            raise SubscriberLagging
+        if self._events:
+            return self._events.popleft()
+        if self._latest:
+            return self._latest.pop(next(iter(self._latest)))
+        return None
+
+    def _wakeup(self) -> None:
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+
+class NotificationHub:
+    """Hub de notifications : un seul abonnement au broker par worker, diffusé aux abonnés
+
+    Tout ce qui doit atteindre les clients de tous les workers passe par `publish`
+    (broker) ; `broadcast` ne diffuse qu'aux abonnés du worker courant. Les abonnés
+    sont regroupés par salon : un événement n'est remis qu'aux abonnés de son salon.
+
+    La diffusion ne bloque jamais : un abonné dont la file déborde est retiré du salon,
+    sans ralentir les autres ni accumuler d'événements en mémoire.
+    """
+
+    def __init__(
+        self, broker: Broker, message_cache_size: int = 1024, subscriber_queue_size: int = 256
+    ):
+        self.broker = broker
+        self.message_cache = MessageCache(message_cache_size)
+        self.subscriber_queue_size = subscriber_queue_size
+        self._rooms: dict[str, set[Subscription]] = {}
+        self._listeners: list[Callable[[Event], None]] = []
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(subscribers) for subscribers in self._rooms.values())
+
+    @property
+    def room_count(self) -> int:
+        return len(self._rooms)
+
+    def room_subscriber_count(self, room_id: str) -> int:
+        return len(self._rooms.get(room_id, ()))
+
+    async def start(self) -> None:
+        """S'abonne au broker (appelé au démarrage de l'application)"""
+        await self.broker.start(self._on_message)
+
+    async def stop(self) -> None:
+        """Se désabonne du broker et libère tous les abonnés"""
+        await self.broker.stop()
+
+        for subscribers in self._rooms.values():
+            for subscription in subscribers:
+                subscription.close()
+        self._rooms.clear()
+
+    def subscribe(self, room_id: str) -> Subscription:
+        """Abonne un client à un salon ; `get` retourne None quand le hub s'est arrêté"""
+        subscription = Subscription(room_id, self.subscriber_queue_size)
+        self._rooms.setdefault(room_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._rooms.get(subscription.room_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._rooms[subscription.room_id]
+
+    def add_listener(self, listener: Callable[[Event], None]) -> None:
+        """Enregistre un écouteur interne appelé une fois par événement (hors abonnés SSE)"""
+        self._listeners.append(listener)
+
+    async def publish(self, channel: str, payload: str) -> None:
+        """Publie sur le broker : chaque worker (y compris celui-ci) le recevra une fois"""
+        await self.broker.publish(channel, payload)
+
+    def broadcast(self, event: Event) -> None:
+        """Diffuse un événement aux seuls abonnés de ce worker"""
+        self._dispatch(event)
+
+    def _dispatch(self, event: Event) -> None:
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"❌ Erreur dans un écouteur du hub: {e}")
+
+        if event.event == CHANNEL_TYPING:
+            return
+        if event.room is None:
+            rooms = list(self._rooms.values())
+        else:
+            rooms = [self._rooms.get(event.room, ())]
+
+        lagging = [
+            subscription
+            for subscribers in rooms
+            for subscription in subscribers
+            if not subscription.put(event)
+        ]
+        for subscription in lagging:
+            self._drop_lagging(subscription)
+
+    def _drop_lagging(self, subscription: Subscription) -> None:
+        """Retire un abonné dont la file déborde ; il reprendra depuis son dernier ID"""
+        self.unsubscribe(subscription)
+        dropped = subscription.mark_lagging()
+        # L'événement refusé compte aussi parmi les abandons
+        events_dropped.inc("slow_consumer", amount=dropped + 1)
+        slow_consumers.inc("overflow")
+        print(f"🐢 Client trop lent déconnecté (salon: {subscription.room_id})")
+
+    async def _on_message(self, channel: str, payload: str) -> None:
+        """Point d'entrée du broker"""
+        if channel == CHANNEL_RECONNECT:
+            broker_reconnects.inc()
+        try:
+            event = await self._resolve(channel, payload)
+        except Exception as e:
+            events_dropped.inc("resolve_error")
+            print(f"❌ Erreur lors du traitement de la notification: {e}")
+            return
+        if event is not None:
+            self._dispatch(event)
+
+    async def _resolve(self, channel: str, payload: str) -> Event | None:
+        """Transforme une notification en événement, une seule fois pour tout le worker"""
+        if channel == CHANNEL_CHAT:
+            if payload.startswith("{"):
+                # Le message complet voyage dans le payload
+                data = payload
+                message = json_codec.loads(data)
+                self.message_cache.put(message["id"], data)
+            else:
+                # Payload trop gros : seul l'ID est transmis, on charge le message une fois
+                message_id = int(payload)
+                data = self.message_cache.get(message_id)
+                if data is None:
+                    data = await fetch_message_data(message_id)
+                    if data is None:
+                        events_dropped.inc("message_not_found")
+                        return None
+                    self.message_cache.put(message_id, data)
+                message = json_codec.loads(data)
+
+            read_router.observe(message["id"])
+            print(f"📨 Notification reçue pour le message ID: {message['id']}")
+            return Event("message", data, str(message["id"]), message["room_id"])
+
+        if channel in PASSTHROUGH_CHANNELS:
+            return Event(channel, payload, room=json_codec.loads(payload)["room_id"])
+
+        if channel == CHANNEL_RECONNECT:
+            return Event(channel, payload)
+
+        return None
+
+
+notification_hub = NotificationHub(
+    create_broker(BROKER_CHANNELS),
+    message_cache_size=settings.message_cache_size,
+    subscriber_queue_size=settings.subscriber_queue_size,
+)
@@ -0,0 +1,91 @@
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.database import AsyncSessionLocal, ReadSessionLocal
+from config.settings import get_settings
+from models.message import Message
+from services.metrics import db_reads
+
+settings = get_settings()
+
+
+class ReadRouter:
+    """Répartit les lectures de MessageService entre la réplique et le primaire
+
+    Une lecture qui doit voir un message donné (`min_id`) n'est servie par la réplique
+    que si celle-ci le contient déjà : la réplique applique les commits dans l'ordre,
+    donc tout ce qui a été validé avant lui aussi. Sinon, et tant qu'une réplique
+    injoignable n'a pas été réessayée, la lecture passe par le primaire.
+    """
+
+    def __init__(self, enabled: bool, retry_delay: float = 5.0):
+        self.enabled = enabled
+        self.retry_delay = retry_delay
+        # Plus grand ID de message validé connu de ce worker (écrit ou notifié)
+        self.latest_id = 0
+        # Plus grand ID de message constaté sur la réplique
+        self.replica_id = 0
+        self._unavailable_until = 0.0
+        self._probe: asyncio.Task[None] | None = None
+
+    def observe(self, message_id: int) -> None:
+        """Enregistre un message validé : les lectures « à jour » devront le voir"""
+        if message_id > self.latest_id:
+            self.latest_id = message_id
+
+    async def use_replica(self, min_id: int | None = None) -> bool:
+        if not self.enabled or time.monotonic() < self._unavailable_until:
+            return False
+        if min_id is None or self.replica_id >= min_id:
+            return True
+        await self.refresh()
+        return self.replica_id >= min_id
+
+    async def refresh(self) -> None:
+        """Relit le dernier ID de la réplique ; une seule sonde partagée par les lectures"""
+        if self._probe is None:
+            self._probe = asyncio.create_task(self._read_replica_id())
+        await asyncio.shield(self._probe)
+
+    async def _read_replica_id(self) -> None:
+        try:
+            async with ReadSessionLocal() as db:
+                replica_id = await db.scalar(select(func.max(Message.id)))
+            self.replica_id = max(self.replica_id, replica_id or 0)
+        except Exception as e:
+            self.mark_unavailable(e)
+        finally:
+            self._probe = None
+
+    def mark_unavailable(self, error: Exception) -> None:
+        self._unavailable_until = time.monotonic() + self.retry_delay
+        print(f"⚠️ Réplique indisponible, lectures sur le primaire: {error}")
+
+    @asynccontextmanager
+    async def session(self, min_id: int | None = None) -> AsyncIterator[AsyncSession]:
+        """Session de lecture, sur la réplique si elle contient déjà le message `min_id`"""
+        if not await self.use_replica(min_id):
+            db_reads.inc("primary")
+            async with AsyncSessionLocal() as db:
+                yield db
+            return
+
+        db_reads.inc("replica")
+        try:
+            async with ReadSessionLocal() as db:
+                yield db
+        except OperationalError as e:
+            # Connexion perdue : les lectures suivantes iront au primaire pendant un temps
+            self.mark_unavailable(e)
+            raise
+
+
+read_router = ReadRouter(
+    enabled=settings.database_read_url is not None, retry_delay=settings.replica_retry_delay
+)
@@ -0,0 +1,88 @@
+import bisect
+import itertools
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+
+from config.settings import get_settings
+from services.notification_hub import CHANNEL_RECONNECT, Event, NotificationHub, notification_hub
+
+settings = get_settings()
+
+
+def event_id(event: Event) -> int:
+    return int(event.id)  # type: ignore
+
+
+@dataclass(slots=True)
+class RoomReplay:
+    # Événements « message » par ID croissant
+    events: deque[Event]
+    # Tous les messages du salon d'ID supérieur à `floor` sont dans `events`
+    floor: int
+
+
+class ReplayBuffer:
+    """Derniers messages de chaque salon, déjà sérialisés, gardés en mémoire par worker
+
+    Un client qui se reconnecte avec un Last-Event-ID couvert par le tampon est rattrapé
+    sans requête DB. Le tampon d'un salon ne couvre que les messages reçus par ce worker
+    depuis le premier événement du salon, dans la limite de `room_size` messages.
+    """
+
+    def __init__(self, hub: NotificationHub, room_size: int = 256, max_rooms: int = 1024):
+        self.hub = hub
+        self.room_size = room_size
+        self.max_rooms = max_rooms
+        self._rooms: OrderedDict[str, RoomReplay] = OrderedDict()
+
+    async def start(self) -> None:
+        self.hub.add_listener(self.on_event)
+
+    def events_after(self, room_id: str, last_id: int) -> list[Event] | None:
+        """Messages du salon postérieurs à `last_id`, ou None si le tampon ne les couvre pas"""
+        room = self._rooms.get(room_id)
+        if room is None or last_id < room.floor:
+            return None
+        self._rooms.move_to_end(room_id)
+        start = bisect.bisect_right(room.events, last_id, key=event_id)
+        return [event.replayed() for event in itertools.islice(room.events, start, None)]
+
+    def on_event(self, event: Event) -> None:
+        """Écouteur du hub : ajoute les nouveaux messages au tampon de leur salon"""
+        if event.event == CHANNEL_RECONNECT:
+            # Des messages ont pu être perdus pendant la coupure : le tampon n'est plus complet
+            self._rooms.clear()
+            return
+        if event.event != "message" or event.room is None or event.id is None:
+            return
+
+        message_id = int(event.id)
+        room = self._rooms.get(event.room)
+        if room is None:
+            # Les messages antérieurs au premier reçu par ce worker ne sont pas connus
+            room = self._rooms[event.room] = RoomReplay(deque([event]), message_id)
+            if len(self._rooms) > self.max_rooms:
+                self._rooms.popitem(last=False)
+            return
+        if message_id <= room.floor:
+            return
+
+        events = room.events
+        if message_id > event_id(events[-1]):
+            events.append(event)
+        else:
+            # Notifié dans le désordre par des commits concurrents
+            index = bisect.bisect_left(events, message_id, key=event_id)
+            if index < len(events) and event_id(events[index]) == message_id:
+                return
+            events.insert(index, event)
+
+        if len(events) > self.room_size:
+            room.floor = event_id(events.popleft())
+
+
+replay_buffer = ReplayBuffer(
+    notification_hub,
+    room_size=settings.replay_buffer_size,
+    max_rooms=settings.replay_buffer_rooms,
+)
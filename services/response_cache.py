@@ -0,0 +1,107 @@
+import asyncio
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from collections.abc import Sequence
+
+from services.conversation_context import ContextTurn
+
+_BOT_MENTION = re.compile(r"@bot\b", re.IGNORECASE)
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Normalise une question : sans mention @bot, casse, ponctuation ni espaces multiples"""
+    prompt = _BOT_MENTION.sub(" ", prompt.lower())
+    return " ".join(_NON_WORD.sub(" ", prompt).split())
+
+
+class ResponseCache:
+    """Cache TTL + LRU des réponses du bot, avec déduplication des appels en vol
+
+    La clé combine le salon, la question normalisée et une empreinte des derniers
+    messages humains de la conversation (les mentions @bot et les réponses du bot en
+    sont exclues, pour que plusieurs utilisateurs posant la même question partagent
+    la même réponse). L'auteur n'en fait pas partie : il ne figure pas dans le prompt.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 60.0, context_size: int = 5):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.context_size = context_size
+        self.hits = 0
+        self.misses = 0
+        self.inflight_joins = 0
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future[str]] = {}
+
+    def make_key(self, prompt: str, room_id: str, turns: Sequence[ContextTurn]) -> str:
+        relevant = [
+            f"{msg.username}:{normalize_prompt(msg.message)}"
+            for msg in turns
+            if not msg.is_bot and not _BOT_MENTION.search(msg.message)
+        ]
+        relevant = relevant[-self.context_size :] if self.context_size > 0 else []
+        fingerprint = hashlib.sha1("\n".join(relevant).encode()).hexdigest()
+        return f"{room_id}|{normalize_prompt(prompt)}|{fingerprint}"
+
+    def get(self, key: str) -> str | None:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= time.monotonic():
+            del self._entries[key]
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: str, value: str) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def get_inflight(self, key: str) -> asyncio.Future[str] | None:
+        future = self._inflight.get(key)
+        if future is not None:
+            self.inflight_joins += 1
+        return future
+
+    def begin(self, key: str) -> asyncio.Future[str]:
+        """Déclare un appel en vol pour cette clé (les suivants attendront son résultat)"""
+        future: asyncio.Future[str] = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        return future
+
+    def resolve(self, key: str, result: str) -> None:
+        """Termine l'appel en vol avec succès : met en cache et réveille les appels en attente"""
+        self.put(key, result)
+        future = self._inflight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(result)
+
+    def fail(self, key: str, error: BaseException) -> None:
+        """Termine l'appel en vol en erreur : les appels en attente échouent aussi"""
+        future = self._inflight.pop(key, None)
+        if future is None or future.done():
+            return
+        if isinstance(error, asyncio.CancelledError):
+            future.cancel()
+        else:
+            future.set_exception(error)
+            # Évite l'avertissement "exception never retrieved" s'il n'y a aucune attente
+            future.exception()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "inflight": len(self._inflight),
+            "inflight_joins": self.inflight_joins,
+        }
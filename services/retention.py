@@ -0,0 +1,128 @@
+"""Rétention des messages : déplace les messages anciens vers la table d'archive
+
+Les requêtes courantes (historique récent, rattrapage, contexte du bot) ne lisent que
+la table `messages`, qui garde ainsi une taille bornée. À lancer périodiquement (cron) :
+
+    pdm run archive [--days N] [--batch-size N]
+"""
+
+import argparse
+import asyncio
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.database import AsyncSessionLocal, async_engine
+from config.settings import get_settings
+from models.message import ArchivedMessage, Message
+
+settings = get_settings()
+
+
+def month_start(value: datetime) -> datetime:
+    return value.astimezone(UTC).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_month(value: datetime) -> datetime:
+    return value.replace(year=value.year + value.month // 12, month=value.month % 12 + 1)
+
+
+class RetentionService:
+    @staticmethod
+    async def ensure_partitions(db: AsyncSession, start: datetime, end: datetime) -> None:
+        """Crée les partitions mensuelles de l'archive couvrant [start, end] (PostgreSQL)"""
+        table = ArchivedMessage.__tablename__
+        month = month_start(start)
+        while month <= end:
+            upper = next_month(month)
+            await db.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {table}_{month:%Y_%m} PARTITION OF {table} "
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+                )
+            )
+            month = upper
+        await db.commit()
+
+    @staticmethod
+    async def archive_batch(db: AsyncSession, cutoff: datetime, batch_size: int) -> int:
+        """Déplace au plus `batch_size` messages antérieurs à `cutoff`, en une transaction"""
+        query = (
+            select(Message.id)
+            .where(Message.timestamp < cutoff)
+            .order_by(Message.id)
+            .limit(batch_size)
+        )
+        if db.bind.dialect.name == "postgresql":
+            # Plusieurs jobs simultanés se partagent les lignes au lieu de s'attendre
+            query = query.with_for_update(skip_locked=True)
+        ids = list(await db.scalars(query))
+        if not ids:
+            return 0
+
+        columns = [column.name for column in Message.__table__.c]
+        await db.execute(
+            insert(ArchivedMessage).from_select(
+                columns,
+                select(*(Message.__table__.c[name] for name in columns)).where(
+                    Message.id.in_(ids)
+                ),
+            )
+        )
+        await db.execute(delete(Message).where(Message.id.in_(ids)))
+        await db.commit()
+        return len(ids)
+
+
+async def archive_messages(retention_days: int, batch_size: int) -> int:
+    """Archive les messages plus anciens que `retention_days` jours, par lots"""
+    cutoff = datetime.now(UTC) - timedelta(days=retention_days)
+    print(f"🗄️ Archivage des messages antérieurs au {cutoff:%Y-%m-%d %H:%M} UTC")
+
+    try:
+        async with AsyncSessionLocal() as db:
+            if db.bind.dialect.name == "postgresql":
+                oldest = await db.scalar(
+                    select(func.min(Message.timestamp)).where(Message.timestamp < cutoff)
+                )
+                if oldest is not None:
+                    await RetentionService.ensure_partitions(db, oldest, cutoff)
+
+        total = 0
+        while True:
+            # Une transaction courte par lot : les insertions concurrentes ne sont pas bloquées
+            async with AsyncSessionLocal() as db:
+                moved = await RetentionService.archive_batch(db, cutoff, batch_size)
+            if not moved:
+                break
+            total += moved
+            print(f"📦 {total} messages archivés")
+    finally:
+        # Fermer le pool : les threads aiosqlite empêcheraient sinon le job de se terminer
+        await async_engine.dispose()
+
+    print(f"✅ Archivage terminé : {total} messages déplacés")
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Archive les messages anciens")
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=settings.message_retention_days,
+        help="Âge (en jours) au-delà duquel un message est archivé",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=settings.archive_batch_size,
+        help="Messages déplacés par transaction",
+    )
+    args = parser.parse_args()
+    asyncio.run(archive_messages(args.days, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import asyncio
+import contextlib
+import time
+from dataclasses import dataclass
+
+from config.settings import get_settings
+from services import json_codec
+from services.notification_hub import CHANNEL_TYPING, Event, NotificationHub, notification_hub
+
+settings = get_settings()
+
+
+@dataclass(slots=True)
+class TypingState:
+    avatar: str
+    expires_at: float
+
+
+class TypingService:
+    """Présence « en train d'écrire » tenue en mémoire, sans écriture en DB
+
+    Seules les transitions start/stop (et un rafraîchissement avant expiration)
+    sont publiées sur le broker ; chaque worker applique ces mises à jour à son
+    état local, puis une tâche périodique expire les états périmés et diffuse à
+    ses abonnés au plus une mise à jour agrégée par intervalle, uniquement si la
+    liste d'un salon a changé.
+    """
+
+    def __init__(self, hub: NotificationHub, ttl: float = 5.0, interval: float = 0.5):
+        self.hub = hub
+        self.ttl = ttl
+        self.interval = interval
+        # États par salon, puis par utilisateur
+        self._typing: dict[str, dict[str, TypingState]] = {}
+        self._last_snapshots: dict[str, tuple[tuple[str, str], ...]] = {}
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._broadcast_forever())
+        self.hub.add_listener(self.on_event)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def update(self, room_id: str, username: str, avatar: str, is_typing: bool) -> None:
+        """Publie un événement typing s'il change l'état partagé par les workers
+
+        Un start répété n'est republié que lorsque l'état approche de son expiration.
+        La présence est éphémère : un échec de publication est journalisé sans être
+        propagé (connexion WebSocket ou requête HTTP de l'appelant).
+        """
+        state = self._typing.get(room_id, {}).get(username)
+        if is_typing:
+            if state is not None and state.expires_at - time.monotonic() > self.ttl / 2:
+                return
+        elif state is None:
+            return
+
+        payload = {
+            "room_id": room_id,
+            "username": username,
+            "avatar": avatar,
+            "is_typing": is_typing,
+        }
+        try:
+            await self.hub.publish(CHANNEL_TYPING, json_codec.dumps(payload))
+        except Exception as e:
+            print(f"❌ Échec de la publication de l'état typing de '{username}': {e}")
+
+    def on_event(self, event: Event) -> None:
+        """Écouteur du hub : applique une mise à jour typing reçue du broker"""
+        if event.event != CHANNEL_TYPING:
+            return
+        data = json_codec.loads(event.data)
+        if data["is_typing"]:
+            self._typing.setdefault(data["room_id"], {})[data["username"]] = TypingState(
+                data["avatar"], time.monotonic() + self.ttl
+            )
+        else:
+            self._typing.get(data["room_id"], {}).pop(data["username"], None)
+
+    def snapshot(self, room_id: str) -> tuple[tuple[str, str], ...]:
+        """Expire les états périmés et retourne les utilisateurs actifs d'un salon, triés"""
+        typing = self._typing.get(room_id, {})
+        now = time.monotonic()
+        expired = [name for name, state in typing.items() if state.expires_at <= now]
+        for name in expired:
+            del typing[name]
+        return tuple(sorted((name, state.avatar) for name, state in typing.items()))
+
+    def build_event(self, room_id: str, snapshot: tuple[tuple[str, str], ...]) -> Event:
+        users = [{"username": name, "avatar": avatar} for name, avatar in snapshot]
+        return Event("typing", json_codec.dumps({"users": users}), room=room_id)
+
+    async def _broadcast_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            for room_id in list(self._typing.keys() | self._last_snapshots.keys()):
+                snapshot = self.snapshot(room_id)
+                if snapshot != self._last_snapshots.get(room_id, ()):
+                    self.hub.broadcast(self.build_event(room_id, snapshot))
+                if snapshot:
+                    self._last_snapshots[room_id] = snapshot
+                else:
+                    # Salon sans activité : ne plus le parcourir
+                    self._last_snapshots.pop(room_id, None)
+                    self._typing.pop(room_id, None)
+
+
+typing_service = TypingService(
+    notification_hub, ttl=settings.typing_ttl, interval=settings.typing_broadcast_interval
+)
@@ -3,10 +3,36 @@ const messagesContainer = document.getElementById("messages-container");
 const messageForm = document.getElementById("message-form");
 const messageInput = document.getElementById("message-input");
 const toastContainer = document.getElementById("toast-container");
+const typingIndicator = document.getElementById("typing-indicator");
 
-// État de connexion SSE
+// Transport : WebSocket de préférence, SSE (+ POST) en repli
+let socket = null;
 let eventSource = null;
 let isConnected = false;
+const WS_RECONNECT_DELAY = 2000;
+// Envois WebSocket en attente d'accusé, par référence
+const pendingSends = new Map();
+let nextSendRef = 1;
+// Dernier message reçu, pour le rattrapage à la reconnexion WebSocket
+let lastMessageId = Number(
+  messagesContainer.querySelector(".chat[data-message-id]:last-of-type")?.dataset
+    .messageId || 0
+);
+
+// État « en train d'écrire » (le serveur expire l'état après quelques secondes)
+const TYPING_IDLE_DELAY = 2000;
+const TYPING_REFRESH_DELAY = 2000;
+let isTyping = false;
+let lastTypingSent = 0;
+let typingTimeout = null;
+
+// Bulles du bot en cours de génération, par stream_id
+const streamingBubbles = new Map();
+
+// État de l'historique (pagination keyset)
+let hasMoreHistory =
+  document.getElementById("history-state")?.dataset.hasMore === "true";
+let isLoadingHistory = false;
 
 // Formater l'heure
 function formatTime(timestamp) {
@@ -22,6 +48,9 @@ function createMessageElement(msg) {
   const isOwnMessage = msg.username === username;
   const chatDiv = document.createElement("div");
   chatDiv.className = `chat ${isOwnMessage ? "chat-end" : "chat-start"}`;
+  if (msg.id) {
+    chatDiv.dataset.messageId = msg.id;
+  }
 
   chatDiv.innerHTML = `
         <div class="chat-image">
@@ -55,11 +84,100 @@ function escapeHtml(text) {
 
 // Ajouter un message au conteneur
 function addMessage(msg) {
+  if (msg.id > lastMessageId) {
+    lastMessageId = msg.id;
+  }
   const messageElement = createMessageElement(msg);
-  messagesContainer.appendChild(messageElement);
+  const existing = messagesContainer.querySelector(
+    `.chat[data-message-id="${msg.id}"]`
+  );
+
+  if (existing) {
+    // Bulle déjà affichée (ex. réponse du bot streamée) : la remplacer en place
+    existing.replaceWith(messageElement);
+  } else {
+    messagesContainer.appendChild(messageElement);
+  }
   scrollToBottom();
 }
 
+// Ajouter un fragment à la bulle du bot en cours de génération
+function appendBotDelta(data) {
+  let bubble = streamingBubbles.get(data.stream_id);
+  if (!bubble) {
+    bubble = createMessageElement({
+      username: data.username,
+      avatar: data.avatar,
+      message: "",
+      is_bot: true,
+      timestamp: new Date().toISOString(),
+    });
+    streamingBubbles.set(data.stream_id, bubble);
+    messagesContainer.appendChild(bubble);
+  }
+
+  bubble.querySelector(".chat-bubble").textContent += data.delta;
+  scrollToBottom();
+}
+
+// Fin de génération : relier la bulle provisoire au message enregistré
+function finishBotStream(data) {
+  const bubble = streamingBubbles.get(data.stream_id);
+  if (!bubble) {
+    return;
+  }
+  streamingBubbles.delete(data.stream_id);
+
+  const persisted =
+    data.message_id !== null &&
+    messagesContainer.querySelector(`.chat[data-message-id="${data.message_id}"]`);
+
+  if (data.message_id === null || persisted) {
+    // Échec de génération, ou message final déjà reçu via l'événement "message"
+    bubble.remove();
+  } else {
+    bubble.dataset.messageId = data.message_id;
+  }
+}
+
+// Charger une page de messages plus anciens
+async function loadOlderMessages() {
+  if (isLoadingHistory || !hasMoreHistory) {
+    return;
+  }
+
+  const oldest = messagesContainer.querySelector(".chat[data-message-id]");
+  if (!oldest) {
+    return;
+  }
+
+  isLoadingHistory = true;
+  try {
+    const response = await fetch(
+      `/api/messages?room=${encodeURIComponent(room)}&before_id=${oldest.dataset.messageId}`
+    );
+    if (!response.ok) {
+      throw new Error("Erreur lors du chargement de l'historique");
+    }
+
+    const page = await response.json();
+    hasMoreHistory = page.has_more;
+
+    // Conserver la position de lecture après l'insertion en haut
+    const previousHeight = messagesContainer.scrollHeight;
+    const fragment = document.createDocumentFragment();
+    page.messages.forEach((msg) => {
+      fragment.appendChild(createMessageElement(msg));
+    });
+    messagesContainer.insertBefore(fragment, messagesContainer.firstChild);
+    messagesContainer.scrollTop += messagesContainer.scrollHeight - previousHeight;
+  } catch (error) {
+    console.error("Erreur:", error);
+  } finally {
+    isLoadingHistory = false;
+  }
+}
+
 // Défiler vers le bas
 function scrollToBottom() {
   messagesContainer.scrollTop = messagesContainer.scrollHeight;
@@ -82,15 +200,43 @@ function showToast(message, type = "info") {
   }, 3000);
 }
 
+// Envoyer une trame sur la WebSocket et attendre son accusé
+function sendOverSocket(message) {
+  return new Promise((resolve, reject) => {
+    const ref = nextSendRef++;
+    pendingSends.set(ref, { resolve, reject });
+    socket.send(JSON.stringify({ t: "m", r: ref, d: message }));
+  });
+}
+
+// Échouer les envois en attente (connexion WebSocket perdue)
+function rejectPendingSends() {
+  for (const pending of pendingSends.values()) {
+    pending.reject(new Error("Connexion WebSocket perdue"));
+  }
+  pendingSends.clear();
+}
+
+function isSocketOpen() {
+  return socket !== null && socket.readyState === WebSocket.OPEN;
+}
+
 // Envoyer un message
 async function sendMessage(message) {
   try {
+    if (isSocketOpen()) {
+      await sendOverSocket(message);
+      messageInput.value = "";
+      return;
+    }
+
     const response = await fetch("/api/messages", {
       method: "POST",
       headers: {
         "Content-Type": "application/json",
       },
       body: JSON.stringify({
+        room_id: room,
         username: username,
         avatar: avatar,
         message: message,
@@ -108,13 +254,163 @@ async function sendMessage(message) {
   }
 }
 
+// Envoyer l'état typing
+function sendTyping(isTypingNow) {
+  if (isSocketOpen()) {
+    socket.send(JSON.stringify({ t: "y", d: isTypingNow }));
+    return;
+  }
+
+  fetch("/api/typing", {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+    },
+    body: JSON.stringify({
+      room_id: room,
+      username: username,
+      avatar: avatar,
+      is_typing: isTypingNow,
+    }),
+  }).catch((error) => console.error("Erreur typing:", error));
+}
+
+// Signaler la frappe : un seul envoi par intervalle, arrêt après inactivité
+function notifyTyping() {
+  const now = Date.now();
+  if (!isTyping || now - lastTypingSent > TYPING_REFRESH_DELAY) {
+    isTyping = true;
+    lastTypingSent = now;
+    sendTyping(true);
+  }
+
+  clearTimeout(typingTimeout);
+  typingTimeout = setTimeout(stopTyping, TYPING_IDLE_DELAY);
+}
+
+function stopTyping() {
+  clearTimeout(typingTimeout);
+  if (isTyping) {
+    isTyping = false;
+    sendTyping(false);
+  }
+}
+
+// Afficher les utilisateurs en train d'écrire (hors soi-même)
+function renderTyping(users) {
+  const names = users
+    .filter((user) => user.username !== username)
+    .map((user) => user.username);
+
+  if (names.length === 0) {
+    typingIndicator.textContent = "";
+  } else if (names.length === 1) {
+    typingIndicator.textContent = `${names[0]} est en train d'écrire…`;
+  } else {
+    typingIndicator.textContent = `${names.join(", ")} sont en train d'écrire…`;
+  }
+}
+
+// Nouveau message reçu (WebSocket ou SSE)
+function handleIncomingMessage(msg) {
+  addMessage(msg);
+
+  // Afficher un toast si c'est un nouveau message d'un autre utilisateur
+  if (msg.username !== username && !msg.is_bot) {
+    showToast(`${msg.username} a envoyé un message`, "info");
+  }
+}
+
+// Trames compactes de la WebSocket : {"t": type, "d": données}
+function handleFrame(frame) {
+  switch (frame.t) {
+    case "m":
+      handleIncomingMessage(frame.d);
+      break;
+    case "d":
+      appendBotDelta(frame.d);
+      break;
+    case "f":
+      finishBotStream(frame.d);
+      break;
+    case "y":
+      renderTyping(frame.d.users);
+      break;
+    case "a":
+      pendingSends.get(frame.d.r)?.resolve(frame.d);
+      pendingSends.delete(frame.d.r);
+      break;
+    case "e": {
+      const pending = frame.d && pendingSends.get(frame.d.r);
+      if (pending) {
+        pending.reject(new Error(frame.d.error));
+        pendingSends.delete(frame.d.r);
+      } else {
+        console.error("Erreur WebSocket:", frame.d);
+      }
+      break;
+    }
+  }
+}
+
+// Connexion WebSocket (repli sur SSE si elle ne s'ouvre pas)
+function connectWebSocket() {
+  if (!("WebSocket" in window)) {
+    connectSSE();
+    return;
+  }
+
+  const protocol = window.location.protocol === "https:" ? "wss" : "ws";
+  const params = new URLSearchParams({ room: room });
+  if (lastMessageId) {
+    params.set("last_id", lastMessageId);
+  }
+
+  let opened = false;
+  socket = new WebSocket(`${protocol}://${window.location.host}/ws?${params}`);
+
+  socket.onopen = () => {
+    opened = true;
+    isConnected = true;
+    console.log("Connexion WebSocket établie");
+  };
+
+  socket.onmessage = (event) => {
+    try {
+      handleFrame(JSON.parse(event.data));
+    } catch (error) {
+      console.error("Erreur de parsing:", error);
+    }
+  };
+
+  socket.onclose = () => {
+    socket = null;
+    isConnected = false;
+    rejectPendingSends();
+
+    if (!opened) {
+      // WebSocket bloquée (proxy, navigateur) : basculer sur SSE
+      console.warn("WebSocket indisponible, repli sur SSE");
+      connectSSE();
+      return;
+    }
+    setTimeout(connectWebSocket, WS_RECONNECT_DELAY);
+  };
+}
+
 // Connexion SSE
 function connectSSE() {
   if (eventSource) {
     eventSource.close();
   }
 
-  eventSource = new EventSource("/api/stream");
+  // Le navigateur reprend seul depuis son Last-Event-ID ; une nouvelle connexion
+  // reprend depuis le dernier message affiché
+  const params = new URLSearchParams({ room: room });
+  if (lastMessageId) {
+    params.set("last_id", lastMessageId);
+  }
+  eventSource = new EventSource(`/api/stream?${params}`);
 
   eventSource.onopen = () => {
     isConnected = true;
@@ -123,13 +419,31 @@ function connectSSE() {
 
   eventSource.addEventListener("message", (event) => {
     try {
-      const msg = JSON.parse(event.data);
-      addMessage(msg);
+      handleIncomingMessage(JSON.parse(event.data));
+    } catch (error) {
+      console.error("Erreur de parsing:", error);
+    }
+  });
 
-      // Afficher un toast si c'est un nouveau message d'un autre utilisateur
-      if (msg.username !== username && !msg.is_bot) {
-        showToast(`${msg.username} a envoyé un message`, "info");
-      }
+  eventSource.addEventListener("bot_delta", (event) => {
+    try {
+      appendBotDelta(JSON.parse(event.data));
+    } catch (error) {
+      console.error("Erreur de parsing:", error);
+    }
+  });
+
+  eventSource.addEventListener("bot_done", (event) => {
+    try {
+      finishBotStream(JSON.parse(event.data));
+    } catch (error) {
+      console.error("Erreur de parsing:", error);
+    }
+  });
+
+  eventSource.addEventListener("typing", (event) => {
+    try {
+      renderTyping(JSON.parse(event.data).users);
     } catch (error) {
       console.error("Erreur de parsing:", error);
     }
@@ -155,14 +469,24 @@ messageForm.addEventListener("submit", (e) => {
   const message = messageInput.value.trim();
 
   if (message) {
+    stopTyping();
     sendMessage(message);
   }
 });
 
+messageInput.addEventListener("input", notifyTyping);
+
+// Chargement de l'historique au défilement vers le haut
+messagesContainer.addEventListener("scroll", () => {
+  if (messagesContainer.scrollTop < 100) {
+    loadOlderMessages();
+  }
+});
+
 // Initialisation
 document.addEventListener("DOMContentLoaded", () => {
   scrollToBottom();
-  connectSSE();
+  connectWebSocket();
   messageInput.focus();
 
   showToast(`Bienvenue ${username} ! 👋`, "success");
@@ -170,6 +494,10 @@ document.addEventListener("DOMContentLoaded", () => {
 
 // Nettoyage à la fermeture
 window.addEventListener("beforeunload", () => {
+  if (socket) {
+    socket.onclose = null;
+    socket.close();
+  }
   if (eventSource) {
     eventSource.close();
   }